@@ -1,117 +1,52 @@
+from backends import registry  # Imported first so startup timings cover everything below
 import os
 import customtkinter
-from youtube_transcript_api import YouTubeTranscriptApi
-from openai import OpenAI
-import spacy
-from summarizer import Summarizer
-from heapq import nlargest
-import google.generativeai as genai
-from PIL import Image, ImageTk
-import requests
-from io import BytesIO
-from pytube import YouTube
+from PIL import ImageTk
 import sys
+import threading
 import tkinter as tk
+from transcript_cache import TranscriptCache
+from summary_cache import SummaryCache
+from thumbnail_cache import ThumbnailCache
+from clients import clients
+from jobs import JobRunner, TextboxStreamer
+from mapreduce import MapReduceResult
+from pipeline import startGemini, getVideoID
+from dispatcher import DEFAULT_DEADLINE, HedgedDispatcher
+from live import DEFAULT_POLL_INTERVAL, LiveSummarizer
+from segment_index import IndexStore, SegmentFocus, link_timestamps
+from tracing import install_sinks, tracer
+from log_console import LEVELS, LogConsole, LogStream
+
+registry.mark("imports done")
+
+# Set SUMMARIZER_WARM_UP=0 to skip loading the selected backend after startup
+WARM_UP = os.getenv("SUMMARIZER_WARM_UP", "1") != "0"
+
+# Seconds between transcript polls in live mode
+LIVE_POLL_INTERVAL = float(os.getenv("SUMMARIZER_LIVE_POLL", DEFAULT_POLL_INTERVAL))
+
+# Seconds an LLM backend has to start answering before the summary is made
+# locally with spaCy. SUMMARIZER_HEDGE_BACKEND names the backend that gets a
+# second request when the first is slow (by default the same one).
+SUMMARY_DEADLINE = float(os.getenv("SUMMARIZER_DEADLINE", DEFAULT_DEADLINE))
+HEDGE_BACKEND = os.getenv("SUMMARIZER_HEDGE_BACKEND") or None
+
+# Stage timings are printed to the console; SUMMARIZER_TRACE=0 turns that off.
+# SUMMARIZER_TRACE_FILE writes a Chrome trace (open it in Perfetto) and
+# SUMMARIZER_METRICS_PORT serves Prometheus histograms on /metrics.
+METRICS_PORT = os.getenv("SUMMARIZER_METRICS_PORT")
+trace_sinks = install_sinks(console=print if os.getenv("SUMMARIZER_TRACE", "1") != "0" else None,
+                            trace_file=os.getenv("SUMMARIZER_TRACE_FILE"),
+                            metrics_port=int(METRICS_PORT) if METRICS_PORT else None)
 
 customtkinter.set_appearance_mode("System")
 customtkinter.set_default_color_theme("blue")
 
-# Load SpaCy model
-nlp = spacy.load('en_core_web_sm')
-
 # Load environment variables from .env file
 os.environ['OPENAI_API_KEY'] = "your_openai_api_key"
 os.environ['GEMINI_API_KEY'] = "your_gemini_api_key"
 
-model = ""
-
-def startGemini(api_key):
-    global model
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-
-def getApiKey():
-    return os.getenv("OPENAI_API_KEY", "no api key set")
-
-def getGeminiKey():
-    return os.getenv("GEMINI_API_KEY", "no gemini api key set")
-
-def getVideoID(video_url):
-    if '?v=' in video_url:
-        return video_url.split('?v=')[1].split('&')[0]
-    elif 'live/' in video_url:
-        return video_url.split('live/')[1].split('?')[0]
-    elif 'youtu.be' in video_url:
-        return video_url.split('be/')[1].split('?')[0]
-    else:
-        print('Not a recognized YouTube link')
-        return video_url
-
-def get_summary_spacy(text):
-    doc = nlp(text)
-    stopwords = list(spacy.lang.en.stop_words.STOP_WORDS)
-    punctuation = spacy.lang.punctuation.PUNCT
-    
-    word_frequencies = {}
-    for word in doc:
-        if word.text.lower() not in stopwords and word.text.lower() not in punctuation:
-            if word.text not in word_frequencies:
-                word_frequencies[word.text] = 1
-            else:
-                word_frequencies[word.text] += 1
-    
-    max_freq = max(word_frequencies.values())
-    for word in word_frequencies:
-        word_frequencies[word] = word_frequencies[word] / max_freq
-    
-    sentence_tokens = [sent for sent in doc.sents]
-    sentence_scores = {}
-    for sent in sentence_tokens:
-        for word in sent:
-            if word.text.lower() in word_frequencies:
-                if sent not in sentence_scores:
-                    sentence_scores[sent] = word_frequencies[word.text.lower()]
-                else:
-                    sentence_scores[sent] += word_frequencies[word.text.lower()]
-    
-    select_length = int(len(sentence_tokens) * 0.20)
-    summary = nlargest(select_length, sentence_scores, key=sentence_scores.get)
-    final_summary = ' '.join([word.text for word in summary])
-    
-    return final_summary
-
-def get_summary_bert(text):
-    model = Summarizer()
-    summary = model(text, num_sentences=5, min_length=60)
-    return summary
-
-def get_summary_chatgpt(prompt):
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    messages = [{"role": "user", "content": prompt}]
-    chat_completion = client.chat.completions.create(
-        messages=messages,
-        model="gpt-3.5-turbo",
-    )
-    return chat_completion.choices[0].message["content"]
-
-def get_summary_gemini(prompt):
-    response = model.generate_content(prompt)
-    return response.text
-
-# Custom class to redirect stdout to the debug textbox
-class StdoutRedirector:
-    def __init__(self, textbox):
-        self.textbox = textbox
-
-    def write(self, text):
-        print(f"Redirecting text: {text}")  # Debug print to ensure this method is called
-        self.textbox.insert("end", text)
-        self.textbox.see("end")
-
-
-    def flush(self):
-        pass  # Required for Python 3 compatibility
-
 # Custom tooltip class
 class ToolTip:
     def __init__(self, widget, text):
@@ -141,6 +76,16 @@ class App(customtkinter.CTk):
         self.geometry("600x800")
         self.title("Youtube Summarizer")
 
+        self.transcript_cache = TranscriptCache()
+        self.summary_cache = SummaryCache()
+        self.thumbnail_cache = ThumbnailCache()
+        self.index_store = IndexStore()
+        self.dispatcher = HedgedDispatcher(SUMMARY_DEADLINE, HEDGE_BACKEND)
+        self.jobs = JobRunner(self)
+        self.active_url = None
+        self.streamer = None
+        self.live_stop = None
+
         self.language_var = customtkinter.StringVar(value="en")
 
         self.language_dropdown = customtkinter.CTkComboBox(
@@ -156,6 +101,7 @@ class App(customtkinter.CTk):
 
         self.video_url_entry = customtkinter.CTkEntry(self, placeholder_text="Video URL", width=280)
         self.video_url_entry.grid(row=0, column=0, padx=20, pady=10)
+        self.video_url_entry.bind("<KeyRelease>", self.on_url_change)
         ToolTip(self.video_url_entry, text="Enter the YouTube video URL")
 
         # self.summarizer_dropdown = customtkinter.CTkComboBox(self, values=["ChatGPT", "Google Gemini", "SpaCy", "BERT"], variable=self.summarizer_var, width=280)
@@ -164,10 +110,15 @@ class App(customtkinter.CTk):
         self.summarizer_dropdown.bind("<<ComboboxSelected>>", self.on_summarizer_change)
         ToolTip(self.summarizer_dropdown, text="Select the summarization method")
 
-        self.prompt_entry = customtkinter.CTkEntry(self, placeholder_text="Custom Prompt", width=450)
-        self.prompt_entry.grid(row=2, column=0, columnspan=2, padx=20, pady=10)
+        self.prompt_entry = customtkinter.CTkEntry(self, placeholder_text="Custom Prompt", width=280)
+        self.prompt_entry.grid(row=2, column=0, padx=20, pady=10)
         ToolTip(self.prompt_entry, text="Enter a custom prompt for summarization")
 
+        self.focus_var = customtkinter.BooleanVar(value=False)
+        self.focus_checkbox = customtkinter.CTkCheckBox(self, text="Focus", variable=self.focus_var)
+        self.focus_checkbox.grid(row=2, column=1, padx=20, pady=10)
+        ToolTip(self.focus_checkbox, text="Send only the parts of a long transcript that match the custom prompt")
+
         self.api_key_entry = customtkinter.CTkEntry(self, show="*", placeholder_text="API Key", width=280)
         self.api_key_entry.grid(row=3, column=0, padx=20, pady=10)
         ToolTip(self.api_key_entry, text="Enter your API key")
@@ -188,21 +139,45 @@ class App(customtkinter.CTk):
         self.submit_button.grid(row=5, column=0, padx=20, pady=10)
         ToolTip(self.submit_button, text="Submit the request for summarization")
 
+        self.live_var = customtkinter.BooleanVar(value=False)
+        self.live_checkbox = customtkinter.CTkCheckBox(self, text="Live", variable=self.live_var)
+        self.live_checkbox.grid(row=5, column=1, padx=20, pady=10)
+        ToolTip(self.live_checkbox, text="Keep polling a live stream and update the summary as it goes")
+
         self.thumbnail_label = customtkinter.CTkLabel(self, text="")
         self.thumbnail_label.grid(row=6, column=0, columnspan=2, padx=20, pady=10)
         ToolTip(self.thumbnail_label, text="Displays the video thumbnail")
 
         # Debug button and textbox
-        # self.debug_button = customtkinter.CTkButton(self, text="Show Debug Console", command=self.toggle_debug_console)
-        # self.debug_button.grid(row=7, column=0, padx=20, pady=10)
-        # ToolTip(self.debug_button, text="Click to show or hide the debug console")
-
-        # self.debug_textbox = customtkinter.CTkTextbox(self, width=465, height=100, wrap="word")
-        # self.debug_textbox.grid(row=8, column=0, columnspan=2, padx=20, pady=10)
-        # self.debug_textbox.grid_remove()  # Start hidden
-
-        # Redirect stdout to the debug textbox
-        # sys.stdout = StdoutRedirector(self.debug_textbox)
+        self.debug_button = customtkinter.CTkButton(self, text="Show Debug Console", command=self.toggle_debug_console)
+        self.debug_button.grid(row=7, column=0, padx=20, pady=10)
+        ToolTip(self.debug_button, text="Click to show or hide the debug console")
+
+        self.log_level_var = customtkinter.StringVar(value="INFO")
+        self.log_level_dropdown = customtkinter.CTkOptionMenu(self, values=list(LEVELS), variable=self.log_level_var,
+                                                              command=self.on_log_level_change, width=100)
+        self.log_level_dropdown.grid(row=7, column=1, padx=20, pady=10)
+        ToolTip(self.log_level_dropdown, text="Lowest level shown in the debug console")
+
+        self.debug_textbox = customtkinter.CTkTextbox(self, width=465, height=100, wrap="word")
+        self.debug_textbox.grid(row=8, column=0, columnspan=2, padx=20, pady=10)
+        self.debug_textbox.grid_remove()  # Start hidden
+
+        # Redirect stdout and stderr to the debug textbox; the terminal still gets a copy
+        self.log_console = LogConsole(self, self.debug_textbox, level=self.log_level_var.get())
+        self.log_console.start()
+        sys.stdout = LogStream(self.log_console, "INFO", echo=sys.__stdout__)
+        sys.stderr = LogStream(self.log_console, "ERROR", echo=sys.__stderr__)
+
+        self.after_idle(self.on_window_shown)
+
+    def on_window_shown(self):
+        registry.mark("window shown")
+        if WARM_UP:
+            self.jobs.submit("warm-up", registry.warm_up, [self.summarizer_var.get()], background=False,
+                             on_done=lambda _: print(registry.startup_report()))
+        else:
+            print(registry.startup_report())
 
     def toggle_debug_console(self):
         if self.debug_textbox.winfo_ismapped():
@@ -212,6 +187,9 @@ class App(customtkinter.CTk):
             self.debug_textbox.grid()
             self.debug_button.configure(text="Hide Debug Console")
 
+    def on_log_level_change(self, level):
+        self.log_console.set_level(level)
+
     def reveal_api_key(self):
         if self.api_key_entry.cget("show") == "":
             self.api_key_entry.configure(show="*")
@@ -228,31 +206,58 @@ class App(customtkinter.CTk):
             self.api_key_entry.grid_remove()
             self.reveal_button.grid_remove()
 
+        if WARM_UP:
+            self.jobs.submit("warm-up", registry.warm_up, [summarizer], background=False)
+
+    def show_result(self, text):
+        self.result_textbox.delete(1.0, "end")
+        self.result_textbox.insert("end", text)
+
+    def cancel_video_jobs(self):
+        self.jobs.cancel("video")
+        if self.streamer is not None:
+            self.streamer.stop()
+            self.streamer = None
+        self.stop_live()
+
+    def stop_live(self):
+        if self.live_stop is not None:
+            self.live_stop.set()
+            self.live_stop = None
+
+    def on_url_change(self, event=None):
+        # Results for a URL that is no longer in the entry are stale
+        if self.video_url_entry.get() != self.active_url:
+            self.cancel_video_jobs()
+            self.active_url = None
+
     def get_video_info(self):
         video_url = self.video_url_entry.get()
         video_id = getVideoID(video_url)
-        
-        try:
-            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-            languages = [transcript.language_code for transcript in transcript_list]
-            self.language_dropdown.configure(values=languages)
-        except Exception as e:
-            self.result_textbox.delete(1.0, "end")
-            self.result_textbox.insert("end", f"Failed to retrieve transcript list: {e}")
-            return
 
-        try:
-            yt = YouTube(video_url)
-            thumbnail_url = yt.thumbnail_url
-            response = requests.get(thumbnail_url)
-            img_data = response.content
-            img = Image.open(BytesIO(img_data))
-            img.thumbnail((500, 500))
+        self.cancel_video_jobs()
+        self.active_url = video_url
+
+        # Transcript listing and thumbnail download run in parallel
+        self.jobs.submit("video", self.transcript_cache.list_languages, video_id,
+                         on_done=self.show_languages, on_error=self.show_languages_error)
+        self.jobs.submit("video", self.thumbnail_cache.get, video_id,
+                         on_done=self.show_thumbnail, on_error=self.show_thumbnail_error)
+
+    def show_languages(self, languages):
+        self.language_dropdown.configure(values=languages)
+
+    def show_languages_error(self, e):
+        self.show_result(f"Failed to retrieve transcript list: {e}")
+
+    def show_thumbnail(self, img):
+        with tracer.span("render", target="thumbnail"):
             img = ImageTk.PhotoImage(img)
             self.thumbnail_label.configure(image=img)
             self.thumbnail_label.image = img  # Keep reference to avoid garbage collection
-        except Exception as e:
-            self.thumbnail_label.configure(text=f"Failed to load thumbnail: {e}")
+
+    def show_thumbnail_error(self, e):
+        self.thumbnail_label.configure(text=f"Failed to load thumbnail: {e}")
 
     def submit_click(self):
         video_url = self.video_url_entry.get()
@@ -260,38 +265,126 @@ class App(customtkinter.CTk):
         summarizer = self.summarizer_var.get()
         language = self.language_var.get()
         custom_prompt = self.prompt_entry.get()
+        focus = self.focus_var.get()
 
-        if summarizer == "Google Gemini":
-            startGemini(api_key)
-
-        video_id = getVideoID(video_url)
+        if video_url != self.active_url:
+            self.cancel_video_jobs()
+            self.active_url = video_url
+        elif self.streamer is not None:
+            self.streamer.stop()
+        self.stop_live()
 
-        try:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[language])
-        except Exception as e:
-            self.result_textbox.delete(1.0, "end")
-            self.result_textbox.insert("end", f"Failed to retrieve transcript: {e}")
+        if self.live_var.get():
+            self.start_live(video_url, api_key, summarizer, language, custom_prompt)
             return
 
-        transcript_word_list = ' '.join([t['text'] for t in transcript])
-        final_prompt = f"{custom_prompt}\n{transcript_word_list}"
-
-        if summarizer == "ChatGPT":
-            summary = get_summary_chatgpt(final_prompt)
-        elif summarizer == "Google Gemini":
-            summary = get_summary_gemini(final_prompt)
-        elif summarizer == "SpaCy":
-            summary = get_summary_spacy(transcript_word_list)
-        elif summarizer == "BERT":
-            summary = get_summary_bert(transcript_word_list)
-
-        self.result_textbox.delete(1.0, "end")
-        self.result_textbox.insert("end", summary)
-
-app = App()
+        streamer = self.streamer = TextboxStreamer(self, self.result_textbox)
+        streamer.start()
+        # Resubmitting the same URL keeps the job generation, so errors are
+        # tied to the job's own streamer rather than the current one
+        self.jobs.submit("video", self.summarize, streamer, video_url, api_key, summarizer, language, custom_prompt, focus,
+                         on_done=self.on_summary_done, on_error=lambda e: self.show_summary_error(e, streamer))
+
+    def on_summary_done(self, result):
+        streamer, stream, stats = result
+        with tracer.span("render", target="summary"):
+            streamer.finish()
+        if stream is not None:
+            if stats.get("cache") == "hit":
+                print("Summary cache hit")
+            else:
+                print("Fresh summarizer call")
+            if "compaction" in stats:
+                print(stats["compaction"].report())
+            if "focus" in stats:
+                print(stats["focus"].report())
+            if "dispatch" in stats:
+                print(stats["dispatch"].report())
+            # A superseded job must not append to the summary that replaced it
+            if stats.get("links") and not streamer.stopped:
+                self.result_textbox.insert("end", "\n\nSources:\n" + "\n".join(
+                    f"({stamp}) {url}" for stamp, _, url in stats["links"]))
+            print(stream.report())
+            timings = stats.get("timings", [])
+            if len(timings) > 1:
+                print(MapReduceResult(None, timings, stream.total_seconds or 0).report())
+        print(f"Client reuse: {clients.stats()}")
+
+    def start_live(self, video_url, api_key, summarizer, language, custom_prompt):
+        if summarizer == "Google Gemini":
+            startGemini(api_key)
+        live = LiveSummarizer(getVideoID(video_url), language, summarizer, custom_prompt,
+                              fetch=self.transcript_cache.fetch_segments)
+        stop = self.live_stop = threading.Event()
+        self.show_result("Waiting for the live transcript...")
+
+        # Updates replace the result box in place on the Tk loop. Resubmitting
+        # the same URL keeps the job generation, so a stopped session checks
+        # its own event again before touching the box.
+        def show_update(summary):
+            if not stop.is_set():
+                self.show_result(summary)
+
+        def on_update(summary):
+            self.jobs.post("video", show_update, summary)
+
+        def on_poll_error(e):
+            self.jobs.post("video", print, f"Live poll failed: {e}")
+
+        self.jobs.submit("video", live.run, stop, on_update, LIVE_POLL_INTERVAL, on_poll_error,
+                         on_done=lambda _: print(f"Live summary stopped after {live.merges} updates"),
+                         on_error=self.show_summary_error)
+
+    def show_summary_error(self, e, streamer=None):
+        if streamer is not None:
+            if streamer.stopped:
+                return  # Superseded by a newer submit
+            streamer.stop()
+        self.show_result(f"Failed to summarize: {e}")
+
+    # Runs on a worker thread; must not touch any widget. Deltas go through
+    # the streamer, which appends them to the result box once per frame.
+    def summarize(self, streamer, video_url, api_key, summarizer, language, custom_prompt, focus=False):
+        if summarizer == "Google Gemini":
+            startGemini(api_key)
 
-def onPressExit():
-    app.quit()
+        video_id = getVideoID(video_url)
 
-app.protocol("WM_DELETE_WINDOW", onPressExit)
-app.mainloop()
+        # Every span opened below is tagged with the video and backend
+        with tracer.context(video_id=video_id, backend=summarizer):
+            try:
+                transcript = self.transcript_cache.get_transcript(video_id, language)
+            except Exception as e:
+                streamer.put(f"Failed to retrieve transcript: {e}")
+                return streamer, None, {}
+
+            stats = {}
+            focus = SegmentFocus(video_id, store=self.index_store) if focus else None
+            stream = self.dispatcher.stream(transcript, summarizer, custom_prompt, stats, self.summary_cache,
+                                            focus=focus)
+            try:
+                for delta in stream:
+                    if streamer.stopped:
+                        break
+                    streamer.put(delta)
+            finally:
+                stream.close()
+            if "focus" in stats:
+                stats["links"] = link_timestamps(stream.text, video_id)
+        return streamer, stream, stats
+
+if __name__ == "__main__":
+    app = App()
+
+    def onPressExit():
+        app.jobs.shutdown()
+        app.dispatcher.shutdown()
+        clients.close()
+        for sink in trace_sinks:
+            sink.close()
+        app.log_console.stop()
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        app.quit()
+
+    app.protocol("WM_DELETE_WINDOW", onPressExit)
+    app.mainloop()
@@ -0,0 +1,107 @@
+import threading
+import time
+
+# Process start reference for the startup report. Importing this module early
+# (the entry points do) makes the numbers meaningful.
+PROCESS_START = time.perf_counter()
+
+
+# A summarizer backend whose SDK import and model load are deferred until first
+# use. `importer` returns the imported module(s); `loader` turns that into the
+# object the summarize functions work with (a model, a client class, ...).
+class Backend:
+    def __init__(self, name, importer, loader=None):
+        self.name = name
+        self._importer = importer
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded = False
+        self.import_seconds = None
+        self.load_seconds = None
+        self.error = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                try:
+                    started = time.perf_counter()
+                    module = self._importer()
+                    self.import_seconds = time.perf_counter() - started
+
+                    started = time.perf_counter()
+                    value = self._loader(module) if self._loader else module
+                    self.load_seconds = time.perf_counter() - started
+                except Exception as e:
+                    self.error = e
+                    raise
+                self._value = value
+                self.error = None
+                self._loaded = True
+        return self._value
+
+
+class BackendRegistry:
+    def __init__(self):
+        self._backends = {}
+        self.milestones = []  # (label, seconds since process start)
+
+    def register(self, name, importer, loader=None):
+        self._backends[name] = Backend(name, importer, loader)
+        return self._backends[name]
+
+    def get(self, name):
+        try:
+            backend = self._backends[name]
+        except KeyError:
+            raise ValueError(f"Unknown summarizer: {name}") from None
+        return backend.get()
+
+    def names(self):
+        return list(self._backends)
+
+    def mark(self, label):
+        self.milestones.append((label, time.perf_counter() - PROCESS_START))
+
+    def warm_up(self, names, background=True):
+        def _load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Warm-up of {name} failed: {e}")
+            self.mark("warm-up done")
+
+        if not background:
+            _load_all()
+            return None
+        thread = threading.Thread(target=_load_all, name="backend-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def startup_report(self):
+        lines = ["Startup timings:"]
+        for label, seconds in self.milestones:
+            lines.append(f"  {label:<24} {seconds * 1000:8.1f} ms")
+        for backend in self._backends.values():
+            if backend.loaded:
+                line = (f"  {backend.name:<24} import {backend.import_seconds * 1000:8.1f} ms"
+                        f"  load {backend.load_seconds * 1000:8.1f} ms")
+                model_rss = getattr(backend.get(), "rss_mb", None)
+                if model_rss is not None:
+                    line += f"  +{model_rss:.0f} MB"
+                lines.append(line)
+            elif backend.error is not None:
+                lines.append(f"  {backend.name:<24} failed: {backend.error}")
+            else:
+                lines.append(f"  {backend.name:<24} not loaded")
+        return "\n".join(lines)
+
+
+registry = BackendRegistry()
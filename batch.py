@@ -0,0 +1,289 @@
+from backends import registry  # Imported first so startup timings cover everything below
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bert_pool import BertPool
+from clients import clients
+from dispatcher import DEFAULT_DEADLINE, HedgedDispatcher
+from pipeline import (LLM_SUMMARIZERS, SUMMARIZERS, cached_summary, getVideoID, startGemini, stream_transcript,
+                      summarize_transcript)
+from playlists import expand_urls
+from prefetch import DEFAULT_WORKERS as DEFAULT_PREFETCH_WORKERS, Prefetcher, Progress
+from ratelimit import BackendLimiter
+from segment_index import DEFAULT_FOCUS_TOKENS, IndexStore, SegmentFocus, link_timestamps
+from summary_cache import SummaryCache
+from tracing import install_sinks, tracer
+from transcript_cache import TranscriptCache
+
+# (max concurrent calls, calls per second) for each backend; None means unlimited rate
+DEFAULT_LIMITS = {
+    "YouTube": (4, 2.0),
+    "ChatGPT": (4, 1.0),
+    "Google Gemini": (2, 0.25),
+    "SpaCy": (os.cpu_count() or 1, None),
+    "BERT": (1, None),
+    "Fake": (8, None),
+}
+
+
+def read_urls(path):
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def make_limiters(limits=None):
+    limits = dict(DEFAULT_LIMITS, **(limits or {}))
+    return {name: BackendLimiter(concurrency, rate) for name, (concurrency, rate) in limits.items()}
+
+
+class BatchRunner:
+    def __init__(self, summarizer, language="en", custom_prompt="", workers=4,
+                 limits=None, transcript_cache=None, bert_pool=None, on_delta=None, summary_cache=None,
+                 compact=True, token_budget=None, focus_tokens=None, index_store=None, limiters=None,
+                 dispatcher=None, prefetcher=None):
+        self.summarizer = summarizer
+        self.language = language
+        self.custom_prompt = custom_prompt
+        self.workers = workers
+        self.transcript_cache = transcript_cache or TranscriptCache()
+        self.bert_pool = bert_pool
+        self.summary_cache = summary_cache
+        self.compact = compact
+        self.token_budget = token_budget
+        # With a custom prompt, only the passages that match it are sent
+        self.focus_tokens = focus_tokens
+        self.index_store = index_store
+        # Called from worker threads with (result, delta) while a summary streams
+        self.on_delta = on_delta
+        # With a HedgedDispatcher, LLM calls are hedged and bounded by its deadline
+        self.dispatcher = dispatcher
+        # With a Prefetcher, each video waits for its own prefetch rather than
+        # fetching the transcript a second time
+        self.prefetcher = prefetcher
+
+        # Runners that pass the same `limiters` share one set of caps
+        self.limiters = limiters if limiters is not None else make_limiters(limits)
+
+    # `video_id`, when the caller already parsed it, saves parsing the URL again
+    def summarize_url(self, video_url, video_id=None):
+        video_id = video_id or getVideoID(video_url)
+        with tracer.context(video_id=video_id, backend=self.summarizer):
+            return self._summarize_url(video_url, video_id)
+
+    def _summarize_url(self, video_url, video_id):
+        started = time.perf_counter()
+        result = {
+            "url": video_url,
+            "video_id": video_id,
+            "language": self.language,
+            "summarizer": self.summarizer,
+        }
+        try:
+            if self.prefetcher is not None:
+                self.prefetcher.wait(video_id)
+            # After a prefetch this is a cache hit and skips the YouTube limiter;
+            # a failed prefetch gets one more try here
+            transcript = self.transcript_cache.get_transcript(video_id, self.language, self.limiters["YouTube"])
+            with self.limiters[self.summarizer]:
+                if self.summarizer == "BERT" and self.bert_pool is not None:
+                    # Same cache entries as summarize_transcript, computed in the warm pool
+                    stats = {}
+                    result["summary"] = cached_summary(
+                        transcript, self.summarizer, self.custom_prompt,
+                        lambda: self.bert_pool.summarize(' '.join([t['text'] for t in transcript])), stats,
+                        self.summary_cache)
+                    if "cache" in stats:
+                        result["cache"] = stats["cache"]
+                else:
+                    stats = {}
+                    focus = None
+                    if self.focus_tokens:
+                        focus = SegmentFocus(video_id, self.focus_tokens, self.index_store)
+                    if self.dispatcher is not None:
+                        stream = self.dispatcher.stream(transcript, self.summarizer, self.custom_prompt, stats,
+                                                        self.summary_cache, compact=self.compact,
+                                                        budget=self.token_budget, focus=focus)
+                        for delta in stream:
+                            if self.on_delta is not None:
+                                self.on_delta(result, delta)
+                        result["summary"] = stream.text
+                        if stream.first_token_seconds is not None:
+                            result["ttft"] = round(stream.first_token_seconds, 3)
+                    elif self.on_delta is not None:
+                        stream = stream_transcript(transcript, self.summarizer, self.custom_prompt, stats,
+                                                   self.summary_cache, self.compact, self.token_budget, focus)
+                        for delta in stream:
+                            self.on_delta(result, delta)
+                        result["summary"] = stream.text
+                        if stream.first_token_seconds is not None:
+                            result["ttft"] = round(stream.first_token_seconds, 3)
+                    else:
+                        result["summary"] = summarize_transcript(transcript, self.summarizer, self.custom_prompt, stats,
+                                                                 self.summary_cache, self.compact, self.token_budget,
+                                                                 focus)
+                    if "compaction" in stats:
+                        result["compaction"] = stats["compaction"].as_dict()
+                    if "focus" in stats:
+                        result["focus"] = stats["focus"].as_dict()
+                        result["timestamps"] = [{"time": stamp, "seconds": seconds, "url": url} for stamp, seconds, url
+                                                in link_timestamps(result["summary"], video_id)]
+                    if "dispatch" in stats:
+                        result["dispatch"] = stats["dispatch"].as_dict()
+                    if "cache" in stats:
+                        result["cache"] = stats["cache"]
+                    if len(stats.get("timings", [])) > 1:
+                        result["chunks"] = [timing.as_dict() for timing in stats["timings"]]
+            result["status"] = "ok"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["elapsed"] = round(time.perf_counter() - started, 3)
+        return result
+
+    # Yields results in completion order, as soon as each video is done.
+    # `video_ids`, if given, are the IDs of `urls` in the same order.
+    def run(self, urls, video_ids=None):
+        urls = list(urls)
+        video_ids = video_ids or [None] * len(urls)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            futures = [executor.submit(self.summarize_url, url, video_id) for url, video_id in zip(urls, video_ids)]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize YouTube videos without the GUI.")
+    parser.add_argument("input", nargs="?", default="-", help="file with one video URL per line, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file, or - for stdout")
+    parser.add_argument("-s", "--summarizer", choices=SUMMARIZERS, default="Google Gemini")
+    parser.add_argument("-l", "--language", default="en")
+    parser.add_argument("-p", "--prompt", default="", help="custom prompt prepended to the transcript")
+    parser.add_argument("--api-key", help="API key for ChatGPT or Gemini (defaults to the environment)")
+    parser.add_argument("-w", "--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, help="max concurrent calls to the summarizer backend")
+    parser.add_argument("--rate", type=float, help="max summarizer calls per second")
+    parser.add_argument("--bert-workers", type=int, default=0,
+                        help="run BERT in this many warm worker processes (each holds its own model)")
+    parser.add_argument("--stream", action="store_true",
+                        help="also emit {\"video_id\", \"delta\"} records as summary text arrives")
+    parser.add_argument("--no-summary-cache", action="store_true", help="always call the summarizer")
+    parser.add_argument("--prefetch-workers", type=int, default=DEFAULT_PREFETCH_WORKERS,
+                        help="threads fetching transcripts ahead of summarizing, within the YouTube rate limit")
+    parser.add_argument("--no-prefetch", action="store_true", help="fetch each transcript when it is summarized")
+    parser.add_argument("--focus-tokens", type=int, default=0,
+                        help="with a custom prompt, send only the best-matching passages up to this many tokens, "
+                             f"e.g. {DEFAULT_FOCUS_TOKENS} (default 0 sends the whole transcript)")
+    parser.add_argument("--no-compact", action="store_true",
+                        help="send the transcript to LLM backends without removing caption noise and repeats")
+    parser.add_argument("--token-budget", type=int,
+                        help="trim LLM transcripts to this many tokens by dropping the least informative segments")
+    parser.add_argument("--deadline", type=float,
+                        help="seconds an LLM backend has to start answering before the video is summarized "
+                             f"locally with spaCy (default {DEFAULT_DEADLINE:.0f} with --hedge)")
+    parser.add_argument("--hedge", choices=list(LLM_SUMMARIZERS), metavar="BACKEND",
+                        help="send a second request to this backend when the first is slower than its p95")
+    parser.add_argument("--timings", action="store_true", help="print startup and backend load timings to stderr")
+    parser.add_argument("--trace", action="store_true", help="print a line per pipeline stage to stderr")
+    parser.add_argument("--trace-file", help="write pipeline stage timings to this Chrome trace JSON file")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus stage latency histograms on this port")
+    args = parser.parse_args(argv)
+    registry.mark("arguments parsed")
+    # Console trace lines go to stderr so stdout stays valid JSONL
+    trace_sinks = install_sinks(console=(lambda line: print(line, file=sys.stderr)) if args.trace else None,
+                                trace_file=args.trace_file, metrics_port=args.metrics_port)
+
+    if args.summarizer == "Google Gemini":
+        startGemini(args.api_key or os.getenv("GEMINI_API_KEY"))
+    elif args.summarizer == "ChatGPT" and args.api_key:
+        os.environ["OPENAI_API_KEY"] = args.api_key
+
+    concurrency, rate = DEFAULT_LIMITS[args.summarizer]
+    if args.concurrency is not None:
+        concurrency = args.concurrency
+    if args.rate is not None:
+        rate = args.rate
+
+    bert_pool = None
+    if args.summarizer == "BERT" and args.bert_workers > 0:
+        bert_pool = BertPool(args.bert_workers)
+        bert_pool.warm_up()
+        if args.concurrency is None:
+            concurrency = args.bert_workers
+
+    dispatcher = None
+    if args.summarizer in LLM_SUMMARIZERS and (args.deadline is not None or args.hedge):
+        if args.hedge == "Google Gemini" and args.summarizer != "Google Gemini":
+            startGemini(args.api_key or os.getenv("GEMINI_API_KEY"))
+        dispatcher = HedgedDispatcher(args.deadline if args.deadline is not None else DEFAULT_DEADLINE, args.hedge,
+                                      max_workers=2 * args.workers)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+    write_lock = threading.Lock()
+
+    def write(record):
+        with write_lock:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+    on_delta = None
+    if args.stream:
+        def on_delta(result, delta):
+            write({"url": result["url"], "video_id": result["video_id"], "delta": delta})
+
+    runner = BatchRunner(args.summarizer, args.language, args.prompt, args.workers,
+                         limits={args.summarizer: (concurrency, rate)}, bert_pool=bert_pool, on_delta=on_delta,
+                         summary_cache=None if args.no_summary_cache else SummaryCache(),
+                         compact=not args.no_compact, token_budget=args.token_budget,
+                         focus_tokens=args.focus_tokens, index_store=IndexStore(), dispatcher=dispatcher)
+
+    failures = 0
+    try:
+        # Playlist and channel URLs become one entry per video, without repeats
+        videos, expand_errors = expand_urls(read_urls(args.input))
+        for url, e in expand_errors.items():
+            failures += 1
+            write({"url": url, "status": "error", "error": f"{type(e).__name__}: {e}"})
+        # Transcripts are fetched ahead of the summarize workers, in input
+        # order, so results are still written as each video finishes
+        if len(videos) > 1 and not args.no_prefetch:
+            runner.prefetcher = Prefetcher(runner.transcript_cache, args.language, args.prefetch_workers,
+                                           runner.limiters["YouTube"], progress=Progress(len(videos)))
+            runner.prefetcher.start([video_id for video_id, _ in videos])
+        for result in runner.run([url for _, url in videos], [video_id for video_id, _ in videos]):
+            failures += result["status"] != "ok"
+            write(result)
+    finally:
+        if runner.prefetcher is not None:
+            runner.prefetcher.shutdown()
+        if out is not sys.stdout:
+            out.close()
+
+    if args.timings:
+        print(registry.startup_report(), file=sys.stderr)
+        if bert_pool is not None:
+            print(bert_pool.memory_report(), file=sys.stderr)
+        print(f"Client reuse: {clients.stats()}", file=sys.stderr)
+    if bert_pool is not None:
+        bert_pool.shutdown()
+    if dispatcher is not None:
+        dispatcher.shutdown()
+    for sink in trace_sinks:
+        sink.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
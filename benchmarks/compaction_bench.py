@@ -0,0 +1,84 @@
+# Measures what transcript compaction and prompt-focused retrieval save on the
+# same prompt: tokens sent, model latency and cost, with compaction off, on,
+# on with a token budget, and with only the passages matching the prompt.
+#
+#   python benchmarks/compaction_bench.py --videos 10 --segments 1200
+#   python benchmarks/compaction_bench.py --budget 4000 --price-per-mtok 0.35
+#   python benchmarks/compaction_bench.py --prompt "What is said about attention layers?"
+#
+# Transcripts are synthetic auto-captions (rolling repeats, [Music] tags,
+# fillers). The model is a FakeBackend whose latency grows with prompt tokens.
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import registry
+from compaction import compact_transcript
+from fake_backends import FakeBackend
+from fake_servers import fake_auto_captions
+from pipeline import summarize_transcript
+from segment_index import SegmentFocus
+
+PROMPT = "What does the speaker say about gradient descent and evaluation benchmarks?"
+
+
+def run_mode(transcripts, prompt, compact, budget, focus):
+    sent_tokens = 0
+    saved_tokens = 0
+    model_seconds = 0.0
+    started = time.perf_counter()
+    for segments in transcripts:
+        stats = {}
+        summarize_transcript(segments, "Fake", prompt, stats, compact=compact, budget=budget, focus=focus)
+        sent_tokens += sum(timing.tokens for timing in stats["timings"])
+        model_seconds += sum(timing.seconds for timing in stats["timings"])
+        if "compaction" in stats:
+            saved_tokens += stats["compaction"].tokens_saved
+        if "focus" in stats:
+            saved_tokens += stats["focus"].tokens_saved
+    return sent_tokens, saved_tokens, model_seconds, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcript compaction benchmark.")
+    parser.add_argument("--videos", type=int, default=10)
+    parser.add_argument("--segments", type=int, default=1200, help="caption segments per transcript")
+    parser.add_argument("--prompt", default=PROMPT, help="custom prompt used in every run")
+    parser.add_argument("--budget", type=int, default=6000, help="token budget for the trimmed and focused runs")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake model latency per call")
+    parser.add_argument("--token-latency-us", type=float, default=20, help="fake model latency per prompt token")
+    parser.add_argument("--price-per-mtok", type=float, default=0.35, help="input price per million tokens")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    backend = FakeBackend(latency=args.latency_ms / 1000, token_latency=args.token_latency_us / 1e6)
+    registry.register("Fake", lambda: None, lambda _: backend)
+    transcripts = [fake_auto_captions(f"vid{i:08d}", args.segments, args.seed) for i in range(args.videos)]
+
+    started = time.perf_counter()
+    for segments in transcripts:
+        compact_transcript(segments)
+    compaction_ms = (time.perf_counter() - started) * 1000 / len(transcripts)
+    print(f"Compaction takes {compaction_ms:.1f} ms per video")
+
+    print(f"{'mode':<18}{'tokens sent':>13}{'saved':>9}{'model s':>10}{'total s':>10}{'cost $':>10}")
+    baseline = None
+    for name, compact, budget, focus in [("raw", False, None, None), ("compacted", True, None, None),
+                                         (f"budget {args.budget}", True, args.budget, None),
+                                         (f"focused {args.budget}", True, None, SegmentFocus(budget=args.budget))]:
+        sent, saved, model_seconds, total = run_mode(transcripts, args.prompt, compact, budget, focus)
+        line = (f"{name:<18}{sent:>13}{saved:>9}{model_seconds:>10.2f}{total:>10.2f}"
+                f"{sent * args.price_per_mtok / 1e6:>10.4f}")
+        if baseline is None:
+            baseline = sent
+        else:
+            line += f"   {1 - sent / baseline:.0%} fewer tokens than raw"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+# Offline end-to-end benchmark of the summarization pipeline.
+#
+#   python benchmarks/e2e_bench.py --videos 20 --save-baseline baseline.json
+#   python benchmarks/e2e_bench.py --videos 20 --compare baseline.json
+#   python benchmarks/e2e_bench.py --failure-rate 0.05 --llm-latency-ms 800
+#
+# YouTube, the thumbnail host, OpenAI and Gemini are replaced by a local fake
+# server (see fake_servers.py); everything above the HTTP layer is the real
+# code. No display is needed. SpaCy and BERT run the real models when they are
+# installed and are reported as skipped otherwise.
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import thumbnail_cache
+from backends import registry
+from batch import BatchRunner
+from clients import clients
+from fake_servers import FakeConfig, FakeServer, make_fake_genai, make_fake_openai, make_transcript_fetchers
+from pipeline import (get_summary_bert, get_summary_chatgpt, get_summary_gemini, get_summary_spacy, getVideoID,
+                      startGemini, stream_transcript)
+from thumbnail_cache import ThumbnailCache
+from transcript_cache import TranscriptCache
+
+URL_SHAPES = [
+    "https://www.youtube.com/watch?v={id}&t=42s",
+    "https://youtu.be/{id}?si=abc",
+    "https://www.youtube.com/live/{id}?feature=share",
+]
+REGRESSION_TOLERANCE = 0.20
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def rss_mb():
+    # Current resident set size; None where /proc is not available
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# How far memory rises above where it was when a stage started. Samples the
+# current RSS on a background thread; without /proc it falls back to the
+# growth of the process-wide peak, which misses stages below an earlier peak.
+class RssSampler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.growth_mb = None
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._start = rss_mb()
+        self._peak = self._start
+        self._start_peak = peak_rss_mb()
+        if self._start is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, rss_mb() or 0)
+
+    def __exit__(self, *exc):
+        if self._start is None:
+            self.growth_mb = peak_rss_mb() - self._start_peak
+            return False
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, rss_mb() or 0)
+        self.growth_mb = self._peak - self._start
+        return False
+
+
+class StageResult:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0.0
+        self.rss_growth_mb = None
+        self.skipped = None
+
+    def summary(self):
+        if self.skipped:
+            return {"skipped": self.skipped}
+        count = len(self.latencies) + self.errors
+        return {
+            "count": count,
+            "errors": self.errors,
+            "p50_ms": _ms(percentile(self.latencies, 50)),
+            "p95_ms": _ms(percentile(self.latencies, 95)),
+            "throughput_per_s": round(count / self.elapsed, 2) if self.elapsed else None,
+            "rss_growth_mb": round(self.rss_growth_mb, 1),
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def run_stage(results, name, fn, items, latency=None):
+    # `latency`, if given, maps fn's return value to the latency to record
+    # (e.g. time to first token) instead of the wall time of the call
+    stage = StageResult(name)
+    outputs = []
+    with RssSampler() as memory:
+        started = time.perf_counter()
+        for item in items:
+            call_started = time.perf_counter()
+            try:
+                output = fn(item)
+            except Exception:
+                stage.errors += 1
+                outputs.append(None)
+                continue
+            elapsed = time.perf_counter() - call_started
+            stage.latencies.append(latency(output) if latency else elapsed)
+            outputs.append(output)
+        stage.elapsed = time.perf_counter() - started
+    stage.rss_growth_mb = memory.growth_mb
+    results.append(stage)
+    return outputs
+
+
+def skip_stage(results, name, reason):
+    stage = StageResult(name)
+    stage.skipped = reason
+    results.append(stage)
+
+
+def install_fakes(server, spacy_model):
+    session = clients.session
+    registry.register("ChatGPT", lambda: None, lambda _: make_fake_openai(server.base_url, session))
+    registry.register("Google Gemini", lambda: None, lambda _: make_fake_genai(server.base_url, session))
+    thumbnail_cache.THUMBNAIL_URL = server.base_url + "/vi/{video_id}/hqdefault.jpg"
+
+    if spacy_model == "blank":
+        def _blank(_):
+            import spacy
+            nlp = spacy.blank("en")
+            nlp.add_pipe("sentencizer")
+            return nlp
+        registry.register("SpaCy", lambda: None, _blank)
+
+
+def stream_ttft(transcript):
+    stream = stream_transcript(transcript, "Google Gemini", "Summarize this video.")
+    for _ in stream:
+        pass
+    return stream
+
+
+def run(args):
+    config = FakeConfig(latency=args.latency_ms / 1000, llm_latency=args.llm_latency_ms / 1000,
+                        segments=args.segments, failure_rate=args.failure_rate, seed=args.seed)
+    video_ids = [f"vid{i:08d}"[:11] for i in range(args.videos)]
+    urls = [URL_SHAPES[i % len(URL_SHAPES)].format(id=video_id) for i, video_id in enumerate(video_ids)]
+    results = []
+
+    with FakeServer(config) as server, tempfile.TemporaryDirectory() as tmp:
+        install_fakes(server, args.spacy_model)
+        fetch_languages, fetch_segments = make_transcript_fetchers(server.base_url, clients.session)
+        transcripts = TranscriptCache(os.path.join(tmp, "transcripts"), fetch_languages=fetch_languages,
+                                      fetch_segments=fetch_segments)
+        startGemini("fake-key")
+        os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+
+        run_stage(results, "parse_url", getVideoID, urls * 100)
+        run_stage(results, "transcript_list", transcripts.list_languages, video_ids)
+        segments = run_stage(results, "transcript_fetch", lambda v: transcripts.get_transcript(v, "en"), video_ids)
+        run_stage(results, "transcript_fetch_cached", lambda v: transcripts.get_transcript(v, "en"), video_ids)
+        segments = [s for s in segments if s is not None]
+        texts = run_stage(results, "text_join", lambda s: ' '.join([t['text'] for t in s]), segments)
+        prompts = [f"Summarize this video.\n{text}" for text in texts]
+
+        run_stage(results, "summarize_gemini", get_summary_gemini, prompts)
+        run_stage(results, "summarize_chatgpt", get_summary_chatgpt, prompts)
+        run_stage(results, "gemini_stream_ttft", stream_ttft, segments,
+                  latency=lambda stream: stream.first_token_seconds or 0.0)
+
+        try:
+            registry.get("SpaCy")
+        except Exception as e:
+            skip_stage(results, "summarize_spacy", f"spaCy unavailable: {e}")
+        else:
+            run_stage(results, "summarize_spacy", get_summary_spacy, texts)
+
+        if args.bert:
+            try:
+                registry.get("BERT")
+            except Exception as e:
+                skip_stage(results, "summarize_bert", f"BERT unavailable: {e}")
+            else:
+                run_stage(results, "summarize_bert", get_summary_bert, texts[:3])
+        else:
+            skip_stage(results, "summarize_bert", "pass --bert to include")
+
+        thumbnails = ThumbnailCache(os.path.join(tmp, "thumbnails"))
+        # Fetch, decode and resize; drawing it needs a display
+        run_stage(results, "thumbnail_load", thumbnails.get, video_ids)
+        run_stage(results, "thumbnail_load_cached", thumbnails.get, video_ids)
+
+        # The whole headless path on cold caches, as batch.py runs it
+        runner = BatchRunner("Google Gemini", workers=args.workers, transcript_cache=TranscriptCache(
+            os.path.join(tmp, "batch-transcripts"), fetch_languages=fetch_languages, fetch_segments=fetch_segments),
+            limits={"YouTube": (args.workers, None), "Google Gemini": (args.workers, None)})
+        stage = StageResult("headless_batch")
+        with RssSampler() as memory:
+            started = time.perf_counter()
+            for record in runner.run(urls):
+                if record["status"] == "ok":
+                    stage.latencies.append(record["elapsed"])
+                else:
+                    stage.errors += 1
+            stage.elapsed = time.perf_counter() - started
+        stage.rss_growth_mb = memory.growth_mb
+        results.append(stage)
+
+    return {stage.name: stage.summary() for stage in results}
+
+
+def print_report(report, baseline=None):
+    print(f"{'stage':<26} {'n':>6} {'err':>5} {'p50 ms':>11} {'p95 ms':>11} {'ops/s':>12} {'+rss MB':>9}")
+    regressions = []
+    for name, stats in report.items():
+        if "skipped" in stats:
+            print(f"{name:<26} skipped: {stats['skipped']}")
+            continue
+        # Single spaces keep columns apart when a value outgrows its width
+        line = (f"{name:<26} {stats['count']:>6} {stats['errors']:>5} {_fmt(stats['p50_ms']):>11} "
+                f"{_fmt(stats['p95_ms']):>11} {_fmt(stats['throughput_per_s']):>12} {stats['rss_growth_mb']:>9.1f}")
+        base = (baseline or {}).get(name)
+        if base and base.get("p95_ms") and stats["p95_ms"] is not None:
+            ratio = stats["p95_ms"] / base["p95_ms"]
+            line += f"   p95 x{ratio:.2f} vs baseline"
+            if ratio > 1 + REGRESSION_TOLERANCE:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark.")
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--segments", type=int, default=600, help="caption segments per transcript")
+    parser.add_argument("--latency-ms", type=float, default=20, help="fake YouTube latency per request")
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="fake LLM latency to first token")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of fake requests that fail")
+    parser.add_argument("--workers", type=int, default=4, help="worker threads for the headless stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spacy-model", default="en_core_web_sm", help="'blank' runs without the trained model")
+    parser.add_argument("--bert", action="store_true", help="include BERT (slow, loads the model)")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against a baseline written by --save-baseline")
+    parser.add_argument("--json", action="store_true", help="print the raw results as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["stages"]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        regressions = []
+    else:
+        regressions = print_report(report, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "stages": report}, f, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
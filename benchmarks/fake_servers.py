@@ -0,0 +1,288 @@
+# Local stand-ins for YouTube (transcripts, thumbnails), OpenAI and Gemini,
+# served over HTTP on 127.0.0.1 with configurable latency, transcript length
+# and failure rate. The SDK shims at the bottom speak to this server, so the
+# real pipeline code (clients, caches, get_summary_*) runs unchanged on top.
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+WORDS = ("the speaker explains how neural networks learn from data and why gradient descent "
+         "works so well in practice while also covering tokenizers attention layers training "
+         "budgets evaluation benchmarks and deployment costs for large language models").split()
+
+
+class FakeConfig:
+    def __init__(self, latency=0.02, llm_latency=0.2, delta_interval=0.005, segments=600,
+                 failure_rate=0.0, auto_captions=False, playlist_size=200, page_size=100, seed=0):
+        self.latency = latency  # Per YouTube request
+        self.llm_latency = llm_latency  # Until the first token of an LLM reply
+        self.delta_interval = delta_interval  # Between streamed LLM deltas
+        self.segments = segments  # Caption segments per transcript
+        self.failure_rate = failure_rate  # Share of requests answered with a 503
+        self.auto_captions = auto_captions  # Add [Music] tags, fillers and rolling repeats
+        self.playlist_size = playlist_size  # Entries per playlist or channel, repeats included
+        self.page_size = page_size  # Entries per playlist page, like YouTube's 100
+        self.seed = seed
+
+
+def fake_segments(video_id, count, seed=0):
+    rng = random.Random(f"{seed}:{video_id}")
+    segments = []
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 12))]
+        if rng.random() < 0.3:
+            words[-1] += "."
+        segments.append({"text": ' '.join(words), "start": i * 3.0, "duration": 3.0})
+    return segments
+
+
+# Segments shaped like YouTube's auto-generated captions: every line repeats
+# the tail of the previous one, with sound tags and filler words mixed in
+def fake_auto_captions(video_id, count, seed=0):
+    rng = random.Random(f"{seed}:auto:{video_id}")
+    segments = []
+    previous = []
+    for i, segment in enumerate(fake_segments(video_id, count, seed)):
+        if rng.random() < 0.05:
+            segments.append({"text": rng.choice(["[Music]", "[Applause]", "[Laughter]"]),
+                             "start": segment["start"], "duration": segment["duration"]})
+            continue
+        words = segment["text"].split()
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(["um", "uh", "um,", "uh,"]))
+        segments.append({"text": ' '.join(previous[-rng.randint(3, 6):] + words),
+                         "start": segment["start"], "duration": segment["duration"]})
+        previous = words
+    return segments
+
+
+# Video IDs of a fake playlist or channel. Every 25th entry repeats the one
+# before it, as playlists may list a video twice.
+def fake_playlist(source, size):
+    video_ids = []
+    for i in range(size):
+        if i and i % 25 == 0:
+            video_ids.append(video_ids[-1])
+        else:
+            video_ids.append(hashlib.sha1(f"{source}:{i}".encode("utf-8")).hexdigest()[:11])
+    return video_ids
+
+
+def _playlist_page(source, offset, config):
+    video_ids = fake_playlist(source, config.playlist_size)
+    items = [{"playlistVideoRenderer": {"videoId": video_id}}
+             for video_id in video_ids[offset:offset + config.page_size]]
+    if offset + config.page_size < len(video_ids):
+        items.append({"continuationItemRenderer": {"continuationEndpoint": {
+            "continuationCommand": {"token": f"{source}|{offset + config.page_size}"}}}})
+    return {"contents": {"playlistVideoListRenderer": {"contents": items}}}
+
+
+def fake_reply(prompt):
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+    words = prompt.split()
+    return f"Summary {digest}: " + ' '.join(words[-40:])
+
+
+def _make_jpeg():
+    from PIL import Image
+    out = BytesIO()
+    Image.new("RGB", (1280, 720), (200, 30, 30)).save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = FakeConfig()
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+    jpeg = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _failed(self):
+        with self.rng_lock:
+            failed = self.rng.random() < self.config.failure_rate
+        if failed:
+            self._send(503, b"fake outage", "text/plain")
+        return failed
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data):
+        self._send(200, json.dumps(data).encode("utf-8"), "application/json")
+
+    def _stream(self, deltas, wrap):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, delta in enumerate(deltas):
+            if i:
+                time.sleep(self.config.delta_interval)
+            self.wfile.write(f"data: {json.dumps(wrap(delta))}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        time.sleep(self.config.latency)
+        if self._failed():
+            return
+
+        if parts[0] == "languages" and len(parts) == 2:
+            self._send_json(["en", "de"])
+        elif parts[0] == "transcripts" and len(parts) == 2:
+            language = parse_qs(url.query).get("lang", ["en"])[0]
+            if language not in ("en", "de"):
+                self._send(404, b"no transcript", "text/plain")
+                return
+            make_segments = fake_auto_captions if self.config.auto_captions else fake_segments
+            self._send_json(make_segments(parts[1], self.config.segments, self.config.seed))
+        elif url.path == "/playlist" or (parts[0].startswith("@") and parts[-1] == "videos"):
+            source = parse_qs(url.query).get("list", [parts[0]])[0]
+            data = json.dumps(_playlist_page(source, 0, self.config))
+            html = ('<html><script>ytcfg.set({"INNERTUBE_API_KEY":"fake-key","INNERTUBE_CLIENT_VERSION":"2.0"});'
+                    f'</script><script>var ytInitialData = {data};</script></html>')
+            self._send(200, html.encode("utf-8"), "text/html")
+        elif parts[0] == "vi" and len(parts) == 3:
+            if FakeHandler.jpeg is None:
+                FakeHandler.jpeg = _make_jpeg()
+            self._send(200, FakeHandler.jpeg, "image/jpeg")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.startswith("/youtubei/v1/browse"):
+            time.sleep(self.config.latency)
+            if not self._failed():
+                source, offset = body["continuation"].rsplit("|", 1)
+                self._send_json(_playlist_page(source, int(offset), self.config))
+            return
+
+        time.sleep(self.config.llm_latency)
+        if self._failed():
+            return
+
+        if self.path == "/v1/chat/completions":
+            reply = fake_reply(body["messages"][-1]["content"])
+            if body.get("stream"):
+                deltas = [w if i == 0 else " " + w for i, w in enumerate(reply.split(" "))]
+                self._stream(deltas, lambda d: {"choices": [{"delta": {"content": d}}]})
+            else:
+                self._send_json({"choices": [{"message": {"role": "assistant", "content": reply}}]})
+        elif self.path == "/gemini/generate":
+            reply = fake_reply(body["prompt"])
+            if body.get("stream"):
+                words = reply.split(" ")
+                deltas = [' '.join(words[i:i + 4]) + " " for i in range(0, len(words), 4)]
+                self._stream(deltas, lambda d: {"text": d})
+            else:
+                self._send_json({"text": reply})
+        else:
+            self._send(404, b"not found", "text/plain")
+
+
+class FakeServer:
+    def __init__(self, config=None):
+        handler = type("ConfiguredFakeHandler", (FakeHandler,), {
+            "config": config or FakeConfig(),
+            "rng": random.Random((config or FakeConfig()).seed),
+        })
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-server", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
+
+
+def _namespace(data):
+    if isinstance(data, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in data.items()})
+    if isinstance(data, list):
+        return [_namespace(v) for v in data]
+    return data
+
+
+def _sse_events(response):
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data: "):
+            continue
+        payload = line[len("data: "):]
+        if payload == "[DONE]":
+            break
+        yield json.loads(payload)
+
+
+# Minimal replacements for the parts of the openai and google.generativeai
+# SDKs that pipeline.py uses, talking to a FakeServer over the shared session.
+
+def make_fake_openai(base_url, session):
+    class FakeOpenAI:
+        def __init__(self, api_key=None):
+            self.api_key = api_key
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+        def _create(self, messages, model, stream=False, timeout=None):
+            response = session.post(f"{base_url}/v1/chat/completions", stream=stream, timeout=timeout,
+                                    json={"messages": messages, "model": model, "stream": stream})
+            response.raise_for_status()
+            if not stream:
+                return _namespace(response.json())
+            return (_namespace(event) for event in _sse_events(response))
+
+    return FakeOpenAI
+
+
+def make_fake_genai(base_url, session):
+    class FakeGenerativeModel:
+        def __init__(self, model_name):
+            self.model_name = model_name
+
+        def generate_content(self, prompt, stream=False, request_options=None):
+            timeout = (request_options or {}).get("timeout")
+            response = session.post(f"{base_url}/gemini/generate", stream=stream, timeout=timeout,
+                                    json={"prompt": prompt, "model": self.model_name, "stream": stream})
+            response.raise_for_status()
+            if not stream:
+                return _namespace(response.json())
+            return (_namespace(event) for event in _sse_events(response))
+
+    return SimpleNamespace(configure=lambda api_key=None: None, GenerativeModel=FakeGenerativeModel)
+
+
+def make_transcript_fetchers(base_url, session):
+    def fetch_languages(video_id):
+        response = session.get(f"{base_url}/languages/{video_id}")
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_segments(video_id, language):
+        response = session.get(f"{base_url}/transcripts/{video_id}", params={"lang": language})
+        response.raise_for_status()
+        return response.json()
+
+    return fetch_languages, fetch_segments
@@ -0,0 +1,131 @@
+# Compares spacy_engine.summarize with the original get_summary_spacy.
+#
+#   python benchmarks/spacy_engine_bench.py --words 40000
+#   python benchmarks/spacy_engine_bench.py --file transcript.txt --n-process 4
+#
+# 40k words is roughly a three hour talk. Use --model blank to run without
+# en_core_web_sm (rule-based sentences, same code paths otherwise).
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+from heapq import nlargest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spacy
+import spacy.lang.en.stop_words
+import spacy.lang.punctuation
+import spacy_engine
+
+
+# The implementation this engine replaced, kept verbatim as the reference
+def legacy_summary(nlp, text):
+    doc = nlp(text)
+    stopwords = list(spacy.lang.en.stop_words.STOP_WORDS)
+    punctuation = spacy.lang.punctuation.PUNCT
+
+    word_frequencies = {}
+    for word in doc:
+        if word.text.lower() not in stopwords and word.text.lower() not in punctuation:
+            if word.text not in word_frequencies:
+                word_frequencies[word.text] = 1
+            else:
+                word_frequencies[word.text] += 1
+
+    max_freq = max(word_frequencies.values())
+    for word in word_frequencies:
+        word_frequencies[word] = word_frequencies[word] / max_freq
+
+    sentence_tokens = [sent for sent in doc.sents]
+    sentence_scores = {}
+    for sent in sentence_tokens:
+        for word in sent:
+            if word.text.lower() in word_frequencies:
+                if sent not in sentence_scores:
+                    sentence_scores[sent] = word_frequencies[word.text.lower()]
+                else:
+                    sentence_scores[sent] += word_frequencies[word.text.lower()]
+
+    select_length = int(len(sentence_tokens) * 0.20)
+    summary = nlargest(select_length, sentence_scores, key=sentence_scores.get)
+    final_summary = ' '.join([word.text for word in summary])
+
+    return final_summary
+
+
+def synthetic_transcript(words, seed=0):
+    rng = random.Random(seed)
+    vocab = [f"topic{i}" for i in range(400)] + sorted(spacy.lang.en.stop_words.STOP_WORDS)[:150]
+    out = []
+    while len(out) < words:
+        sentence = [rng.choice(vocab) for _ in range(rng.randint(6, 24))]
+        sentence[0] = sentence[0].capitalize()
+        out.extend(sentence)
+        out[-1] += rng.choice([".", ".", "?", "!"])
+    return ' '.join(out[:words])
+
+
+def load(model, full):
+    if model == "blank":
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        return nlp
+    return spacy.load(model) if full else spacy_engine.load_pipeline(model)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(label, fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<10} {best * 1000:10.1f} ms   peak rss {peak_rss_mb():8.1f} MB")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", help="transcript text file (default: synthetic)")
+    parser.add_argument("--words", type=int, default=40000)
+    parser.add_argument("--model", default=spacy_engine.SPACY_MODEL)
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="only run the new engine")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_transcript(args.words)
+    print(f"{len(text.split())} words, {len(text)} characters")
+
+    # Run the engine first so its peak RSS is not hidden by the legacy run
+    engine_nlp = load(args.model, full=False)
+    new = timed("engine", lambda: spacy_engine.summarize(engine_nlp, text, n_process=args.n_process), args.repeat)
+
+    if args.skip_legacy:
+        return 0
+
+    legacy_nlp = load(args.model, full=True)
+    legacy_nlp.max_length = max(legacy_nlp.max_length, len(text) + 1)
+    old = timed("legacy", lambda: legacy_summary(legacy_nlp, text), args.repeat)
+
+    # The legacy scorer counts case-sensitively, so some disagreement is expected
+    new_sents, old_sents = set(new.split(". ")), set(old.split(". "))
+    overlap = len(new_sents & old_sents) / max(1, len(new_sents | old_sents))
+    print(f"summary overlap (jaccard over sentences): {overlap:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Smaller checkpoints (e.g. distilbert-base-uncased) trade quality for memory
+BERT_MODEL = os.getenv("BERT_MODEL", "bert-large-uncased")
+# Torch intra-op threads per model; 0 keeps torch's default
+BERT_THREADS = int(os.getenv("BERT_THREADS", "0"))
+
+BERT_OPTIONS = {"num_sentences": 5, "min_length": 60}
+
+
+def rss_mb(pid=None):
+    try:
+        import psutil
+    except ImportError:
+        if pid is not None:
+            return None
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux; good enough without psutil
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except psutil.Error:
+        return None
+
+
+# Thread-safe wrapper around one loaded Summarizer. Loading the transformer
+# weights dominates the cost of a call, so each process keeps a single copy.
+class BertModel:
+    def __init__(self, model_name=BERT_MODEL, threads=BERT_THREADS):
+        from summarizer import Summarizer
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
+        rss_before = rss_mb()
+        self.model_name = model_name
+        self.model = Summarizer(model=model_name)
+        rss_after = rss_mb()
+        self.rss_mb = None if rss_before is None or rss_after is None else rss_after - rss_before
+        self._lock = threading.Lock()
+
+    def __call__(self, text, **options):
+        options = dict(BERT_OPTIONS, **options)
+        with self._lock:
+            return self.model(text, **options)
+
+
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    _worker_model = BertModel(model_name, threads)
+
+
+def _summarize_in_worker(text, options):
+    return _worker_model(text, **options)
+
+
+def _worker_pid(_):
+    time.sleep(0.05)  # Hold this worker so the others pick up the remaining calls
+    return os.getpid()
+
+
+# Process pool of warm workers, each holding its own model, for running
+# extractive BERT summaries in parallel across cores.
+class BertPool:
+    def __init__(self, workers=2, model_name=BERT_MODEL, threads=None):
+        if threads is None:
+            # Split the cores between workers instead of oversubscribing them
+            threads = max(1, (os.cpu_count() or 1) // workers)
+        self.workers = workers
+        self.model_name = model_name
+        self.pids = []
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(model_name, threads))
+
+    def submit(self, text, **options):
+        return self.executor.submit(_summarize_in_worker, text, options)
+
+    def summarize(self, text, **options):
+        return self.submit(text, **options).result()
+
+    def warm_up(self):
+        # Forces every worker to start and load its model
+        self.pids = sorted(set(self.executor.map(_worker_pid, range(self.workers))))
+
+    def memory_report(self):
+        if not self.pids:
+            self.warm_up()
+        lines = [f"BERT pool ({self.model_name}, {self.workers} workers):"]
+        known = []
+        for pid in self.pids:
+            mb = rss_mb(pid)
+            if mb is None:
+                lines.append(f"  worker {pid}: unknown (install psutil)")
+            else:
+                known.append(mb)
+                lines.append(f"  worker {pid}: {mb:.0f} MB")
+        if known:
+            lines.append(f"  total: {sum(known):.0f} MB")
+        return "\n".join(lines)
+
+    def shutdown(self):
+        self.executor.shutdown()
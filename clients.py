@@ -0,0 +1,77 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backends import registry
+
+POOL_CONNECTIONS = 8  # Distinct hosts kept in the pool
+POOL_MAXSIZE = 16  # Keep-alive connections per host
+
+
+# Keeps one configured API client per backend and rebuilds it only when the API
+# key changes, plus one pooled keep-alive HTTP session for plain downloads
+# (thumbnails, transcripts), so repeated clicks reuse TLS connections.
+class ClientManager:
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+        self._lock = threading.Lock()
+        self._clients = {}  # backend -> (api_key, client)
+        self.builds = {}
+        self.reuses = {}
+
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def _get(self, backend, api_key, build):
+        with self._lock:
+            cached = self._clients.get(backend)
+            if cached is not None and cached[0] == api_key:
+                self.reuses[backend] = self.reuses.get(backend, 0) + 1
+                return cached[1]
+            client = build(api_key)
+            self._clients[backend] = (api_key, client)
+            self.builds[backend] = self.builds.get(backend, 0) + 1
+            return client
+
+    def openai(self, api_key):
+        def _build(api_key):
+            OpenAI = registry.get("ChatGPT")
+            return OpenAI(api_key=api_key)
+        return self._get("ChatGPT", api_key, _build)
+
+    def gemini(self, api_key, model_name):
+        # genai.configure is process-global, so a key change reconfigures it
+        def _build(api_key):
+            genai = registry.get("Google Gemini")
+            genai.configure(api_key=api_key)
+            return genai.GenerativeModel(model_name)
+        return self._get(f"Google Gemini/{model_name}", api_key, _build)
+
+    def connection_stats(self):
+        requests_sent = 0
+        connections = 0
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            requests_sent += pool.num_requests
+            connections += pool.num_connections
+        return {
+            "requests": requests_sent,
+            "connections_opened": connections,
+            "connections_reused": max(0, requests_sent - connections),
+        }
+
+    def stats(self):
+        with self._lock:
+            builds = dict(self.builds)
+            reuses = dict(self.reuses)
+        return {"clients_built": builds, "clients_reused": reuses, "http": self.connection_stats()}
+
+    def close(self):
+        self.session.close()
+
+
+clients = ClientManager()
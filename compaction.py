@@ -0,0 +1,177 @@
+import re
+import string
+from collections import Counter
+
+from mapreduce import estimate_tokens
+
+# Auto-caption sound tags like [Music], [Applause] or (laughter), music notes
+# and ">>" speaker-change markers
+NOISE_PATTERN = re.compile(r"\[[^\]]{1,30}\]|\((?:music|applause|laughter|laughs|inaudible)\)|[♪♫]+|>>",
+                           re.IGNORECASE)
+# Short forms that are also units or abbreviations ("35 mm", "5 ah") are left alone
+FILLER_PATTERN = re.compile(r"\b(?:u+m+|u+h+|e+r+m+|hm+|m{3,}|a+h{2,}|a{2,}h+)\b[,.]?", re.IGNORECASE)
+SPACE_PATTERN = re.compile(r"\s+")
+WORD_PATTERN = re.compile(r"[\w']+")
+
+# Rolling auto-captions repeat the end of the previous line at the start of
+# the next. Shorter matches than this are treated as coincidence.
+MIN_OVERLAP_WORDS = 2
+MAX_OVERLAP_WORDS = 40
+# Overlaps are only removed from transcripts that roll: at least this many
+# segment pairs, and this share of them overlapping. In human-written
+# captions a repeat like "no no" across two lines is real speech.
+ROLLING_MIN_PAIRS = 8
+ROLLING_SHARE = 0.5
+
+
+def _tiktoken_counter():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+_exact_counter = None
+
+
+# Exact with tiktoken installed, otherwise the same estimate the map-reduce
+# windows are sized with
+def count_tokens(text):
+    global _exact_counter
+    if _exact_counter is None:
+        _exact_counter = _tiktoken_counter() or estimate_tokens
+    return _exact_counter(text)
+
+
+def _words(text):
+    return [w.lower() for w in WORD_PATTERN.findall(text)]
+
+
+def _normalize(word):
+    return word.strip(string.punctuation).lower()
+
+
+def clean_text(text):
+    text = NOISE_PATTERN.sub(" ", text)
+    text = FILLER_PATTERN.sub(" ", text)
+    return SPACE_PATTERN.sub(" ", text).strip()
+
+
+# Number of leading words of `text` that repeat the end of `previous`, or 0.
+# Both are cleaned text, so splitting on single spaces gives the words.
+def _overlap(previous, text):
+    previous_words = [_normalize(w) for w in previous.split(" ")[-MAX_OVERLAP_WORDS:]]
+    leading = [_normalize(w) for w in text.split(" ")[:MAX_OVERLAP_WORDS]]
+    for size in range(min(len(previous_words), len(leading)), MIN_OVERLAP_WORDS - 1, -1):
+        if previous_words[-size:] == leading[:size]:
+            return size
+    return 0
+
+
+def is_rolling(overlaps):
+    # `overlaps` has one entry per consecutive pair of segments
+    if len(overlaps) < ROLLING_MIN_PAIRS:
+        return False
+    return sum(1 for size in overlaps if size) / len(overlaps) >= ROLLING_SHARE
+
+
+class CompactionReport:
+    def __init__(self, tokens_before, tokens_after, segments_before, segments_after, noise_removed,
+                 duplicates_removed, trimmed, rolling=False):
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.segments_before = segments_before
+        self.segments_after = segments_after
+        self.noise_removed = noise_removed
+        self.duplicates_removed = duplicates_removed
+        self.trimmed = trimmed
+        self.rolling = rolling  # Whether line-to-line repeats were removed
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    def as_dict(self):
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+            "segments_before": self.segments_before,
+            "segments_after": self.segments_after,
+            "noise_removed": self.noise_removed,
+            "duplicates_removed": self.duplicates_removed,
+            "trimmed": self.trimmed,
+            "rolling": self.rolling,
+        }
+
+    def report(self):
+        share = self.tokens_saved / self.tokens_before if self.tokens_before else 0
+        return (f"Transcript compacted from {self.tokens_before} to {self.tokens_after} tokens "
+                f"({share:.0%} saved; {self.noise_removed} noise-only, {self.duplicates_removed} duplicate "
+                f"and {self.trimmed} low-scoring segments dropped)")
+
+
+def _trim(segments, budget, counts):
+    # Extractive pre-trim: score each segment by how frequent its words are in
+    # the whole transcript and keep the best ones, in order, within `budget`
+    frequencies = Counter(w for segment in segments for w in _words(segment['text']) if len(w) > 3)
+    top = max(frequencies.values(), default=1)
+
+    def score(i):
+        words = [w for w in _words(segments[i]['text']) if len(w) > 3]
+        return sum(frequencies[w] for w in words) / top / (counts[i] + 1)
+
+    kept = set()
+    used = 0
+    for i in sorted(range(len(segments)), key=score, reverse=True):
+        if used + counts[i] > budget:
+            continue
+        kept.add(i)
+        used += counts[i]
+    return [segment for i, segment in enumerate(segments) if i in kept]
+
+
+# Cleans a list of caption segments before they are turned into a prompt.
+# Segments keep their start and duration so timestamps stay usable. Repeats
+# between lines are removed when `rolling` is true; None detects rolling
+# auto-captions from the transcript. With a `budget` (in tokens), the
+# lowest-scoring segments are dropped until the transcript fits. Returns the
+# new segments and a CompactionReport.
+def compact_transcript(segments, budget=None, count=count_tokens, rolling=None):
+    tokens_before = count(' '.join([t['text'] for t in segments]))
+    cleaned = []
+    noise_removed = 0
+    for segment in segments:
+        text = clean_text(segment['text'])
+        if not text:
+            noise_removed += 1
+            continue
+        cleaned.append((segment, text))
+
+    overlaps = [_overlap(previous, text) for (_, previous), (_, text) in zip(cleaned, cleaned[1:])]
+    if rolling is None:
+        rolling = is_rolling(overlaps)
+    compacted = []
+    duplicates_removed = 0
+    for i, (segment, text) in enumerate(cleaned):
+        size = overlaps[i - 1] if i and rolling else 0
+        deduped = ' '.join(text.split(" ")[size:]) if size else text
+        if not deduped:
+            duplicates_removed += 1
+            continue
+        compacted.append(dict(segment, text=deduped))
+
+    trimmed = 0
+    if budget is not None:
+        counts = [count(segment['text']) for segment in compacted]
+        if sum(counts) > budget:
+            kept = _trim(compacted, budget, counts)
+            trimmed = len(compacted) - len(kept)
+            compacted = kept
+
+    tokens_after = count(' '.join([t['text'] for t in compacted]))
+    report = CompactionReport(tokens_before, tokens_after, len(segments), len(compacted), noise_removed,
+                              duplicates_removed, trimmed, rolling)
+    return compacted, report
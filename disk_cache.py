@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+
+# Helpers shared by the on-disk caches: writes go through a temp file and an
+# atomic rename, and file mtimes serve as the LRU clock.
+
+def atomic_write(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove(tmp_path)
+        raise
+
+
+def touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def evict_lru(directory, max_bytes, suffix):
+    entries = []
+    total = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue  # Removed by another instance
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        remove(path)
+        total -= size
@@ -0,0 +1,378 @@
+import contextvars
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import LLM_STREAMERS, stream_transcript, summarize_transcript
+from streaming import SummaryStream
+from tracing import tracer
+
+DEFAULT_DEADLINE = 30.0
+HEDGE_PERCENTILE = 0.95
+DEFAULT_HEDGE_DELAY = 5.0  # Until a backend has MIN_SAMPLES latencies on record
+DEFAULT_FALLBACK_RESERVE = 2.0  # Time kept back for the local fallback, same rule
+MIN_SAMPLES = 5
+FALLBACK_BACKEND = "SpaCy"
+
+# Exponential buckets from 50 ms to about two minutes, 25% apart
+HEDGE_BUCKETS = tuple(round(0.05 * 1.25 ** i, 3) for i in range(36))
+
+_DONE = object()
+
+
+# Latency distribution of one backend. Counts are halved every `decay_every`
+# samples so the percentiles follow the backend as it speeds up or slows down.
+class LatencyHistogram:
+    def __init__(self, buckets=HEDGE_BUCKETS, decay_every=200):
+        self.buckets = buckets
+        self.decay_every = decay_every
+        self._counts = [0.0] * (len(buckets) + 1)
+        self._total = 0.0
+        self._observed = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._counts[bisect_left(self.buckets, seconds)] += 1
+            self._total += 1
+            self._observed += 1
+            if self._observed % self.decay_every == 0:
+                self._counts = [count / 2 for count in self._counts]
+                self._total /= 2
+
+    def percentile(self, p):
+        # Interpolated within the bucket; None until there are MIN_SAMPLES
+        with self._lock:
+            if self._observed < MIN_SAMPLES:
+                return None
+            target = p * self._total
+            cumulative = 0.0
+            for i, count in enumerate(self._counts):
+                if count and cumulative + count >= target:
+                    lower = self.buckets[i - 1] if i else 0.0
+                    upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1] * 2
+                    return lower + (upper - lower) * (target - cumulative) / count
+                cumulative += count
+            return self.buckets[-1] * 2
+
+
+# One final prompt sent to one backend, run on a dispatcher thread. Deltas go
+# to `deltas`; "first" and "done" notices go to the shared `events` queue.
+class Attempt:
+    def __init__(self, backend, role, events):
+        self.backend = backend
+        self.role = role  # "primary" or "hedge"
+        self.events = events
+        self.deltas = queue.Queue()
+        self.started = None  # Set once a dispatcher thread picks it up
+        self.first_token = None
+        self.outcome = None  # "ok", "error" or "cancelled" once finished
+        self.error = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    # The SDK calls carry pipeline.REQUEST_TIMEOUT, so a hung request gives
+    # its thread back even though cancelling only acts between deltas
+    def run(self, prompt):
+        self.started = time.monotonic()
+        if self.cancelled:
+            self.outcome = "cancelled"
+            self.deltas.put(_DONE)
+            self.events.put((self, "done"))
+            return
+        try:
+            stream = LLM_STREAMERS[self.backend](prompt)
+            try:
+                for delta in stream:
+                    # A loser is stopped at the next delta; closing the
+                    # stream also closes its HTTP response
+                    if self.cancelled:
+                        self.outcome = "cancelled"
+                        return
+                    if not delta:
+                        continue
+                    if self.first_token is None:
+                        self.first_token = time.monotonic() - self.started
+                        self.events.put((self, "first"))
+                    self.deltas.put(delta)
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+            self.outcome = "ok"
+        except Exception as e:
+            self.error = e
+            self.outcome = "error"
+        finally:
+            self.deltas.put(_DONE)
+            self.events.put((self, "done"))
+
+    def as_dict(self, started):
+        return {
+            "backend": self.backend,
+            "role": self.role,
+            "started": None if self.started is None else round(self.started - started, 3),
+            "first_token": None if self.first_token is None else round(self.first_token, 3),
+            "outcome": self.outcome or "cancelled",
+            "error": None if self.error is None else f"{type(self.error).__name__}: {self.error}",
+        }
+
+
+# Raised out of the final call when no remote backend answered: `cause` is
+# "timeout" or "error" (every attempt failed)
+class _NoAnswer(Exception):
+    def __init__(self, errors, cause):
+        super().__init__("no remote backend answered")
+        self.errors = errors
+        self.cause = cause
+
+
+# An exception from the pipeline thread, passed on to the consumer
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class DispatchReport:
+    # `fallback` is None, "ok" or "failed"; `winner` is None when nothing
+    # answered; `cause` says why it fell back: "timeout" or "error"
+    def __init__(self, winner, attempts, fallback, elapsed, cause=None):
+        self.winner = winner
+        self.attempts = attempts
+        self.fallback = fallback
+        self.elapsed = elapsed
+        self.cause = cause
+
+    @property
+    def hedged(self):
+        return len(self.attempts) > 1
+
+    def as_dict(self):
+        return {"winner": self.winner, "hedged": self.hedged, "fallback": self.fallback, "cause": self.cause,
+                "elapsed": round(self.elapsed, 3), "attempts": self.attempts}
+
+    def report(self):
+        reason = "Remote backends failed" if self.cause == "error" else "No remote backend answered in time"
+        if self.fallback == "ok":
+            line = f"{reason}; local {self.winner} summary"
+        elif self.fallback == "failed":
+            line = f"{reason} and the local fallback failed"
+        elif self.winner is None:
+            line = "No answer"
+        else:
+            line = f"Answered by {self.winner}"
+        if self.hedged:
+            line += " (hedged: " + ", ".join(f"{a['role']} {a['backend']} {a['outcome']}" for a in self.attempts) + ")"
+        return line + f" in {self.elapsed:.2f}s"
+
+
+# Summarizes with an LLM backend within a deadline. The final call is
+# hedged: if no token has arrived after the backend's p95 latency, a second
+# request goes to `hedge_backend` (the same backend by default) and whichever
+# starts answering first wins; the other is cancelled. A failing request is
+# hedged right away. Map calls for long transcripts run once, unhedged, but
+# count against the same deadline. If nothing has answered when only the local
+# fallback's own p95 is left before the deadline, or the map phase or every
+# final attempt failed, the transcript is summarized locally with spaCy
+# instead. The deadline runs from the start of the request to the first token.
+# Latencies are time to first token of the final call, kept per backend in
+# LatencyHistograms.
+class HedgedDispatcher:
+    def __init__(self, deadline=DEFAULT_DEADLINE, hedge_backend=None, percentile=HEDGE_PERCENTILE,
+                 fallback=FALLBACK_BACKEND, max_workers=8):
+        self.deadline = deadline
+        self.hedge_backend = hedge_backend
+        self.percentile = percentile
+        self.fallback = fallback
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dispatch")
+
+    def histogram(self, backend):
+        with self._lock:
+            return self.histograms.setdefault(backend, LatencyHistogram())
+
+    def _delay(self, backend, default):
+        delay = self.histogram(backend).percentile(self.percentile)
+        return default if delay is None else delay
+
+    def _start(self, backend, role, events, prompt, attempts):
+        attempt = Attempt(backend, role, events)
+        attempts.append(attempt)
+        self._executor.submit(contextvars.copy_context().run, attempt.run, prompt)
+        return attempt
+
+    # Returns a SummaryStream like pipeline.stream_transcript, which also
+    # takes the `options` (compact, budget, focus). `stats` also receives
+    # "dispatch": a DispatchReport, unless the summary came from the cache.
+    def stream(self, transcript, summarizer, custom_prompt, stats=None, cache=None, **options):
+        if summarizer not in LLM_STREAMERS:
+            return stream_transcript(transcript, summarizer, custom_prompt, stats, cache, **options)
+        return SummaryStream(self._dispatch(transcript, summarizer, custom_prompt, stats, cache, options))
+
+    def summarize(self, transcript, summarizer, custom_prompt, stats=None, cache=None, **options):
+        stream = self.stream(transcript, summarizer, custom_prompt, stats, cache, **options)
+        for _ in stream:
+            pass
+        return stream.text
+
+    def _dispatch(self, transcript, summarizer, custom_prompt, stats, cache, options):
+        started = time.monotonic()
+        remote_until = started + self.deadline - self._delay(self.fallback, DEFAULT_FALLBACK_RESERVE)
+        state = {"attempts": [], "winner": None, "fallback": None, "cause": None, "remote_until": remote_until}
+        deltas = queue.Queue()
+        stop = threading.Event()
+
+        # The pipeline (compaction, focus, the cache lookup, any map phase and
+        # the hedged final call) runs on its own thread, so waiting for it is
+        # bounded by the deadline even while a map call hangs. A final call
+        # with no answer raises before the cache sees any text.
+        def drive():
+            inner = stream_transcript(transcript, summarizer, custom_prompt, stats, cache,
+                                      stream_fn=lambda prompt: self._hedge(prompt, summarizer, state), **options)
+            try:
+                for delta in inner:
+                    if stop.is_set():
+                        return
+                    deltas.put(delta)
+                deltas.put(_DONE)
+            except Exception as e:
+                deltas.put(_Failed(e))
+            finally:
+                inner.close()
+
+        errors = []
+        if remote_until > started:
+            threading.Thread(target=contextvars.copy_context().run, args=(drive,), daemon=True,
+                             name="dispatch-pipeline").start()
+        else:
+            state["cause"] = "timeout"  # The deadline leaves no time for a remote call
+
+        try:
+            answered = False
+            while state["cause"] is None:
+                try:
+                    item = deltas.get(timeout=None if answered else max(0.0, remote_until - time.monotonic()))
+                except queue.Empty:
+                    state["cause"] = "timeout"
+                    break
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failed):
+                    if answered:
+                        raise item.error
+                    if isinstance(item.error, _NoAnswer):
+                        state["cause"] = item.error.cause
+                        errors = item.error.errors
+                    else:
+                        state["cause"] = "error"  # Map phase or pipeline failure
+                        errors = [item.error]
+                    break
+                answered = True
+                yield item
+
+            state["fallback"] = "failed"
+            summary = self._fall_back(transcript, errors, cache)
+            state["fallback"] = "ok"
+            state["winner"] = self.fallback
+            yield summary
+        finally:
+            stop.set()
+            for attempt in state["attempts"]:
+                attempt.cancel()
+            if stats is not None and (state["attempts"] or state["fallback"]):
+                stats["dispatch"] = DispatchReport(state["winner"], [a.as_dict(started) for a in state["attempts"]],
+                                                   state["fallback"], time.monotonic() - started, state["cause"])
+
+    def _hedge(self, prompt, summarizer, state):
+        started = time.monotonic()
+        remote_until = state["remote_until"]
+        if remote_until <= started:
+            raise _NoAnswer([], "timeout")  # The map phase used up the time for remote calls
+        hedge_at = started + self._delay(summarizer, DEFAULT_HEDGE_DELAY)
+        hedge_backend = self.hedge_backend or summarizer
+        events = queue.Queue()
+        attempts = state["attempts"]
+        winner = None
+
+        self._start(summarizer, "primary", events, prompt, attempts)
+        hedge_pending = hedge_backend in LLM_STREAMERS
+        try:
+            with tracer.span("dispatch", backend=summarizer, deadline=self.deadline) as span:
+                while winner is None:
+                    now = time.monotonic()
+                    if now >= remote_until:
+                        break
+                    if hedge_pending and now >= hedge_at:
+                        self._start(hedge_backend, "hedge", events, prompt, attempts)
+                        hedge_pending = False
+                    if not hedge_pending and all(a.outcome is not None for a in attempts):
+                        break  # Everything failed
+                    wait_until = min(hedge_at, remote_until) if hedge_pending else remote_until
+                    try:
+                        attempt, kind = events.get(timeout=max(0.0, wait_until - now))
+                    except queue.Empty:
+                        continue
+                    if kind == "first" or attempt.outcome == "ok":
+                        winner = attempt
+                        latency = attempt.first_token
+                        if latency is None:  # Finished without any output
+                            latency = time.monotonic() - attempt.started
+                        self.histogram(attempt.backend).observe(latency)
+                    elif attempt.outcome == "error" and hedge_pending:
+                        hedge_at = now
+
+                for attempt in attempts:
+                    if attempt is not winner:
+                        attempt_started = attempt.started
+                        if attempt.outcome is None and attempt.first_token is None and attempt_started is not None:
+                            # Censored sample: it took at least this long. Attempts
+                            # still queued for a thread say nothing about the backend.
+                            self.histogram(attempt.backend).observe(time.monotonic() - attempt_started)
+                        attempt.cancel()
+                span.set(hedged=len(attempts) > 1, winner=winner.backend if winner else None)
+
+            if winner is None:
+                errors = [a.error for a in attempts if a.error is not None]
+                failed = attempts and all(a.outcome == "error" for a in attempts)
+                raise _NoAnswer(errors, "error" if failed else "timeout")
+
+            state["winner"] = winner.backend
+            while True:
+                delta = winner.deltas.get()
+                if delta is _DONE:
+                    break
+                yield delta
+            if winner.outcome == "error":
+                raise winner.error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def _fall_back(self, transcript, errors, cache):
+        started = time.monotonic()
+        try:
+            summary = summarize_transcript(transcript, self.fallback, "", None, cache)
+        except Exception as e:
+            if errors:
+                raise errors[-1] from e
+            raise TimeoutError(f"No backend answered within {self.deadline:.0f}s and the {self.fallback} "
+                               f"fallback failed: {e}") from e
+        self.histogram(self.fallback).observe(time.monotonic() - started)
+        return summary
+
+    def stats(self):
+        with self._lock:
+            backends = list(self.histograms)
+        return {backend: self.histogram(backend).percentile(self.percentile) for backend in backends}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,45 @@
+import random
+import threading
+import time
+
+from mapreduce import estimate_tokens
+
+
+# Local stand-in for an LLM backend: callable like get_summary_gemini, sleeps
+# to simulate latency and answers with a short, deterministic "summary".
+class FakeBackend:
+    def __init__(self, latency=0.05, jitter=0.0, failure_rate=0.0, context_tokens=None, token_latency=0.0,
+                 seed=None):
+        self.latency = latency
+        self.token_latency = token_latency  # Extra seconds per prompt token, like prefill time
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.context_tokens = context_tokens
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self, tokens):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + tokens * self.token_latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.failure_rate
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError("fake backend failure")
+
+    def __call__(self, prompt):
+        tokens = estimate_tokens(prompt)
+        if self.context_tokens is not None and tokens > self.context_tokens:
+            raise ValueError(f"prompt of {tokens} tokens exceeds the {self.context_tokens} token context window")
+        self._delay(tokens)
+        words = prompt.split()
+        return f"Summary of {tokens} tokens: {' '.join(words[-12:])}"
+
+    # Streams the same answer word by word, the first word after `latency`
+    def stream(self, prompt, delta_interval=0.01):
+        summary = self(prompt)
+        for i, word in enumerate(summary.split(" ")):
+            if i:
+                time.sleep(delta_interval)
+            yield word if i == 0 else " " + word
@@ -0,0 +1,139 @@
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+POLL_INTERVAL_MS = 30
+
+
+# Runs blocking work on a thread pool and hands results back to the Tk event
+# loop. Worker threads never touch widgets: finished jobs are queued and the
+# callbacks run from an after() poll on the main thread.
+class JobRunner:
+    def __init__(self, root, max_workers=4):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarizer-job")
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._groups = {}  # group -> (generation, set of futures)
+        self._closed = False
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def submit(self, group, fn, *args, on_done=None, on_error=None, **kwargs):
+        with self._lock:
+            generation, futures = self._groups.setdefault(group, (0, set()))
+            future = self.executor.submit(fn, *args, **kwargs)
+            futures.add(future)
+
+        def _finished(f):
+            with self._lock:
+                futures.discard(f)
+            if not f.cancelled():
+                self._results.put((group, generation, f, on_done, on_error))
+
+        future.add_done_callback(_finished)
+        return future
+
+    def cancel(self, group):
+        # Pending jobs are dropped; jobs already running cannot be interrupted,
+        # so their results are discarded when they arrive.
+        with self._lock:
+            generation, futures = self._groups.get(group, (0, set()))
+            self._groups[group] = (generation + 1, set())
+        # Cancelling runs done callbacks inline, so do it outside the lock
+        for future in list(futures):
+            future.cancel()
+
+    # Runs fn(*args) on the Tk loop, unless `group` is cancelled before then.
+    # For jobs that report progress while they run. Safe to call from any thread.
+    def post(self, group, fn, *args):
+        with self._lock:
+            generation = self._groups.get(group, (0, None))[0]
+        future = Future()
+        future.set_result(args)
+        self._results.put((group, generation, future, lambda result: fn(*result), None))
+
+    def is_current(self, group, generation):
+        with self._lock:
+            return self._groups.get(group, (0, None))[0] == generation
+
+    def _poll(self):
+        while True:
+            try:
+                group, generation, future, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if not self.is_current(group, generation):
+                continue
+
+            error = future.exception()
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    print(f"Background job failed: {error}")
+            elif on_done is not None:
+                on_done(future.result())
+
+        if not self._closed:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            groups = list(self._groups)
+        for group in groups:
+            self.cancel(group)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+FRAME_MS = 16
+
+
+# Appends text deltas produced on worker threads to a textbox, coalescing
+# everything that arrived since the last frame into a single insert.
+class TextboxStreamer:
+    def __init__(self, root, textbox, frame_ms=FRAME_MS):
+        self.root = root
+        self.textbox = textbox
+        self.frame_ms = frame_ms
+        self._deltas = queue.Queue()
+        self._stopped = False
+        self._finished = False
+
+    def start(self):
+        self.textbox.delete(1.0, "end")
+        self.root.after(self.frame_ms, self._drain)
+
+    # Safe to call from any thread
+    def put(self, delta):
+        if not self._stopped:
+            self._deltas.put(delta)
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def stop(self):
+        self._stopped = True
+
+    # Main thread only: flushes what is left and stops the frame loop
+    def finish(self):
+        self._flush()
+        self._finished = True
+
+    def _flush(self):
+        parts = []
+        while True:
+            try:
+                parts.append(self._deltas.get_nowait())
+            except queue.Empty:
+                break
+        if parts and not self._stopped:
+            self.textbox.insert("end", ''.join(parts))
+            self.textbox.see("end")
+
+    def _drain(self):
+        if self._stopped or self._finished:
+            return
+        self._flush()
+        self.root.after(self.frame_ms, self._drain)
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from compaction import ROLLING_MIN_PAIRS, compact_transcript, count_tokens
+from mapreduce import DEFAULT_WINDOW_TOKENS, WINDOW_TOKENS
+from pipeline import LLM_SUMMARIZERS, SUMMARIZERS, getVideoID, startGemini, summarize_transcript
+from tracing import tracer
+from transcript_cache import fetch_segments
+
+DEFAULT_POLL_INTERVAL = 30.0
+# New material is folded in once this many tokens have arrived, or after
+# MERGE_INTERVAL seconds if anything at all has arrived
+DEFAULT_MERGE_TOKENS = 1500
+DEFAULT_MERGE_INTERVAL = 120.0
+
+ROLLING_PROMPT = ("{custom_prompt}\nThis is the summary of a live stream so far:\n{summary}\n\n"
+                  "Update it with what was said since then. Keep one coherent summary of the whole "
+                  "stream, not a log of updates.\n{text}")
+
+
+# Rolling summary of a transcript that keeps growing, as it does for a live
+# stream. Every poll fetches the transcript, keeps only the segments after the
+# last one already seen, and once enough has piled up folds them into the
+# summary so far. The full transcript is only ever summarized once, at the
+# first merge; after that each prompt is the old summary plus the new text.
+class LiveSummarizer:
+    def __init__(self, video_id, language="en", summarizer="Google Gemini", custom_prompt="",
+                 fetch=fetch_segments, merge_tokens=DEFAULT_MERGE_TOKENS, merge_interval=DEFAULT_MERGE_INTERVAL):
+        self.video_id = video_id
+        self.language = language
+        self.summarizer = summarizer
+        self.custom_prompt = custom_prompt
+        self.fetch = fetch
+        self.merge_tokens = merge_tokens
+        self.merge_interval = merge_interval
+        self.summary = ""
+        self.last_start = None  # Start time of the last segment seen
+        self.merges = 0
+        self._pending = []
+        self._last_segment = None  # Context for deduplicating across polls
+        self._rolling = None  # Rolling auto-captions, once a poll was big enough to tell
+        self._last_merge = time.monotonic()
+
+    def _new_segments(self, segments):
+        if self.last_start is None:
+            return segments
+        return [segment for segment in segments if segment['start'] > self.last_start]
+
+    # One poll: returns the updated summary when new material was folded in,
+    # otherwise None
+    def poll(self, force=False):
+        with tracer.span("live_poll", video_id=self.video_id, backend=self.summarizer) as span:
+            new = self._new_segments(self.fetch(self.video_id, self.language))
+            span.set(new_segments=len(new))
+            if new:
+                self.last_start = new[-1]['start']
+                self._pending.extend(new)
+        if not self._pending:
+            return None
+
+        pending_tokens = count_tokens(' '.join([t['text'] for t in self._pending]))
+        due = time.monotonic() - self._last_merge >= self.merge_interval
+        if not (force or due or pending_tokens >= self.merge_tokens):
+            return None
+        self._merge()
+        return self.summary
+
+    # State only advances once the backend call succeeds; on failure the
+    # pending segments stay queued for the next poll
+    def _merge(self):
+        segments = list(self._pending)
+        with tracer.span("live_merge", video_id=self.video_id, backend=self.summarizer,
+                         segments=len(segments)) as span:
+            if not self.summary or self.summarizer not in LLM_SUMMARIZERS:
+                update = self._summarize_new(segments, self.custom_prompt)
+                # Extractive backends cannot rewrite a summary, so they append
+                summary = update if not self.summary else f"{self.summary}\n\n{update}"
+            else:
+                summary = self._fold(segments)
+            span.set(summary_tokens=count_tokens(summary))
+        self.summary = summary
+        del self._pending[:len(segments)]
+        self._last_segment = segments[-1]
+        self._last_merge = time.monotonic()
+        self.merges += 1
+
+    def _summarize_new(self, segments, custom_prompt):
+        return summarize_transcript(segments, self.summarizer, custom_prompt)
+
+    def _fold(self, segments):
+        # Compact with the previous segment in front, so a caption line that
+        # straddles two polls is not sent twice, then drop it again
+        context = [self._last_segment] if self._last_segment is not None else []
+        compacted, report = compact_transcript(context + segments, rolling=self._rolling)
+        if self._rolling is None and len(segments) >= ROLLING_MIN_PAIRS:
+            self._rolling = report.rolling
+        if context and compacted and compacted[0]['start'] == context[0]['start']:
+            compacted = compacted[1:]
+        text = ' '.join([t['text'] for t in compacted])
+        if not text:
+            return self.summary
+
+        window = WINDOW_TOKENS.get(self.summarizer, DEFAULT_WINDOW_TOKENS)
+        if count_tokens(text) + count_tokens(self.summary) > window:
+            # Too much arrived at once: condense it on its own first
+            text = self._summarize_new(compacted, "")
+        prompt = ROLLING_PROMPT.format(custom_prompt=self.custom_prompt, summary=self.summary, text=text)
+        return LLM_SUMMARIZERS[self.summarizer](prompt)
+
+    # Polls until `stop` is set, calling on_update(summary) after each merge
+    # and on_error(e) when a poll fails. Runs in the calling thread. A poll
+    # still running when `stop` is set reports nothing.
+    def run(self, stop, on_update, poll_interval=DEFAULT_POLL_INTERVAL, on_error=None):
+        while not stop.is_set():
+            try:
+                summary = self.poll()
+            except Exception as e:
+                if on_error is None:
+                    raise
+                if not stop.is_set():
+                    on_error(e)
+            else:
+                if summary is not None and not stop.is_set():
+                    on_update(summary)
+            stop.wait(poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep a rolling summary of a YouTube live stream.")
+    parser.add_argument("url", help="live stream URL")
+    parser.add_argument("-s", "--summarizer", choices=SUMMARIZERS, default="Google Gemini")
+    parser.add_argument("-l", "--language", default="en")
+    parser.add_argument("-p", "--prompt", default="", help="custom prompt for the summary")
+    parser.add_argument("--api-key", help="API key for ChatGPT or Gemini (defaults to the environment)")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL, help="seconds between transcript polls")
+    parser.add_argument("--merge-tokens", type=int, default=DEFAULT_MERGE_TOKENS,
+                        help="fold new segments in once this many tokens have arrived")
+    parser.add_argument("--merge-interval", type=float, default=DEFAULT_MERGE_INTERVAL,
+                        help="fold new segments in at least this often, in seconds")
+    args = parser.parse_args(argv)
+
+    if args.summarizer == "Google Gemini":
+        startGemini(args.api_key or os.getenv("GEMINI_API_KEY"))
+    elif args.summarizer == "ChatGPT" and args.api_key:
+        os.environ["OPENAI_API_KEY"] = args.api_key
+
+    live = LiveSummarizer(getVideoID(args.url), args.language, args.summarizer, args.prompt,
+                          merge_tokens=args.merge_tokens, merge_interval=args.merge_interval)
+
+    def on_update(summary):
+        print(json.dumps({"video_id": live.video_id, "merge": live.merges, "last_start": live.last_start,
+                          "summary": summary}), flush=True)
+
+    def on_error(e):
+        print(f"Poll failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+    try:
+        live.run(threading.Event(), on_update, args.poll, on_error)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
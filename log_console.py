@@ -0,0 +1,112 @@
+import collections
+import threading
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+DRAIN_INTERVAL_MS = 50
+MAX_LINES = 2000  # Kept in the ring buffer and shown in the textbox
+MAX_PENDING = 10000  # Lines waiting for the next drain; the oldest are dropped beyond this
+DRAIN_BATCH = 500  # Lines moved into the textbox per drain
+
+
+def level_of(line, default):
+    # Trace spans are noisy and only useful when looking for them
+    if line.startswith("[trace]"):
+        return "DEBUG"
+    if line.startswith(("Traceback", "Failed", "Error")):
+        return "ERROR"
+    return default
+
+
+# File-like object for sys.stdout/sys.stderr. Any thread may write; complete
+# lines are handed to the console's queue and nothing touches Tk here.
+class LogStream:
+    def __init__(self, console, level="INFO", echo=None):
+        self.console = console
+        self.level = level
+        self.echo = echo  # Original stream to keep writing to, e.g. sys.__stdout__
+        self._local = threading.local()  # Partial line per thread, so prints don't interleave
+
+    def write(self, text):
+        if self.echo is not None:
+            self.echo.write(text)
+        buffered = getattr(self._local, "buffer", "") + text
+        *lines, self._local.buffer = buffered.split("\n")
+        for line in lines:
+            self.console.log(line, level_of(line, self.level))
+        return len(text)
+
+    def flush(self):
+        if self.echo is not None:
+            self.echo.flush()
+
+    def isatty(self):
+        return False
+
+
+# Debug console backed by a bounded queue. Writers only append to a deque;
+# the Tk loop drains it in batches every DRAIN_INTERVAL_MS, inserting each
+# batch with one insert() and one see("end"). The last MAX_LINES lines are
+# kept so changing the level filter can redraw the textbox.
+class LogConsole:
+    def __init__(self, root, textbox, level="INFO", max_lines=MAX_LINES, max_pending=MAX_PENDING,
+                 interval_ms=DRAIN_INTERVAL_MS, batch=DRAIN_BATCH):
+        self.root = root
+        self.textbox = textbox
+        self.level = level
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.batch = batch
+        self.dropped = 0
+        self._pending = collections.deque(maxlen=max_pending)  # append/popleft are thread-safe
+        self._lines = collections.deque(maxlen=max_lines)
+        self._shown = 0  # Lines currently in the textbox
+        self._after_id = None
+
+    def log(self, line, level="INFO"):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append((level, line))
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def set_level(self, level):
+        self.level = level
+        self.textbox.delete("1.0", "end")
+        self._shown = 0
+        self._show(list(self._lines))
+
+    def _visible(self, entries):
+        threshold = LEVELS[self.level]
+        return [line for level, line in entries if LEVELS.get(level, 0) >= threshold]
+
+    def _drain(self):
+        entries = []
+        while len(entries) < self.batch:
+            try:
+                entries.append(self._pending.popleft())
+            except IndexError:
+                break
+        if entries:
+            self._lines.extend(entries)
+            self._show(entries)
+        # Come back sooner while there is a backlog
+        self._after_id = self.root.after(1 if self._pending else self.interval_ms, self._drain)
+
+    def _show(self, entries):
+        lines = self._visible(entries)[-self.max_lines:]
+        if not lines:
+            return
+        self.textbox.insert("end", ''.join(line + "\n" for line in lines))
+        self._shown += len(lines)
+        excess = self._shown - self.max_lines
+        if excess > 0:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
+            self._shown -= excess
+        self.textbox.see("end")
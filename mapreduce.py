@@ -0,0 +1,173 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import tracer
+
+# Prompt budget per request. Well under each model's context window: smaller
+# windows fail less often and finish sooner when summarized in parallel.
+WINDOW_TOKENS = {
+    "ChatGPT": 12000,
+    "Google Gemini": 32000,
+}
+DEFAULT_WINDOW_TOKENS = 8000
+OVERLAP_TOKENS = 200
+MAX_FANOUT = 4
+
+MAP_PROMPT = ("Summarize part {index} of {total} of a video transcript. "
+              "Keep the key points, names and numbers.\n{focus}\n{text}")
+REDUCE_PROMPT = ("{custom_prompt}\nThe following are summaries of consecutive parts of one video. "
+                 "Merge them into a single summary of the whole video.\n{text}")
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English with both model families
+    return max(1, len(text) // 4)
+
+
+def split_windows(segments, max_tokens, overlap_tokens=OVERLAP_TOKENS):
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    windows = []
+    current = []
+    current_tokens = 0
+    for segment in segments:
+        tokens = estimate_tokens(segment['text'])
+        if current and current_tokens + tokens > max_tokens:
+            windows.append(current)
+            # Start the next window with the tail of this one for context
+            carry = []
+            carry_tokens = 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous['text'])
+                if carry_tokens + previous_tokens > overlap_tokens:
+                    break
+                carry.insert(0, previous)
+                carry_tokens += previous_tokens
+            current, current_tokens = carry, carry_tokens
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        windows.append(current)
+    return windows
+
+
+class ChunkTiming:
+    def __init__(self, stage, index, tokens, seconds):
+        self.stage = stage
+        self.index = index
+        self.tokens = tokens
+        self.seconds = seconds
+
+    def as_dict(self):
+        return {"stage": self.stage, "index": self.index, "tokens": self.tokens, "seconds": round(self.seconds, 3)}
+
+
+class MapReduceResult:
+    def __init__(self, summary, timings, elapsed):
+        self.summary = summary
+        self.timings = timings
+        self.elapsed = elapsed
+
+    def report(self):
+        lines = [f"Map-reduce summary in {self.elapsed:.2f}s over {len(self.timings)} calls:"]
+        for timing in self.timings:
+            lines.append(f"  {timing.stage:<8} #{timing.index:<3} {timing.tokens:>7} tokens  {timing.seconds:6.2f}s")
+        return "\n".join(lines)
+
+
+# Summarizes transcripts that do not fit one request: the segments are split
+# into overlapping token-budgeted windows that are summarized concurrently, and
+# the partial summaries are merged, recursively if they are still too long.
+# `summarize_fn` takes a prompt and returns text, e.g. get_summary_gemini.
+class MapReduceSummarizer:
+    def __init__(self, summarize_fn, max_tokens=DEFAULT_WINDOW_TOKENS, overlap_tokens=OVERLAP_TOKENS,
+                 max_fanout=MAX_FANOUT):
+        self.summarize_fn = summarize_fn
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_fanout = max_fanout
+
+    def _call(self, stage, index, prompt, timings):
+        started = time.perf_counter()
+        with tracer.span("model_call", stage=stage, index=index, prompt_tokens=estimate_tokens(prompt)) as span:
+            summary = self.summarize_fn(prompt)
+            span.set(output_tokens=estimate_tokens(summary or ""))
+        timings.append(ChunkTiming(stage, index, estimate_tokens(prompt), time.perf_counter() - started))
+        return summary
+
+    def _fan_out(self, stage, prompts, timings):
+        with ThreadPoolExecutor(max_workers=self.max_fanout, thread_name_prefix=f"mapreduce-{stage}") as executor:
+            # Each call runs in a copy of the caller's context so its spans
+            # keep the video_id and backend attributes
+            futures = [executor.submit(contextvars.copy_context().run, self._call, stage, i, prompt, timings)
+                       for i, prompt in enumerate(prompts)]
+            return [future.result() for future in futures]
+
+    def summarize(self, segments, custom_prompt=""):
+        started = time.perf_counter()
+        timings = []
+        stage, prompt = self._final_prompt(segments, custom_prompt, timings)
+        summary = self._call(stage, 0, prompt, timings)
+        return MapReduceResult(summary, timings, time.perf_counter() - started)
+
+    # Same as summarize, but the last call goes through `stream_fn`, which takes
+    # a prompt and yields text deltas. Timings are appended to `timings`.
+    def stream(self, segments, stream_fn, custom_prompt="", timings=None):
+        timings = [] if timings is None else timings
+        stage, prompt = self._final_prompt(segments, custom_prompt, timings)
+        started = time.perf_counter()
+        output_chars = 0
+        with tracer.span("model_call", stage=stage, index=0, prompt_tokens=estimate_tokens(prompt),
+                         streaming=True) as span:
+            for delta in stream_fn(prompt):
+                output_chars += len(delta or "")
+                yield delta
+            span.set(output_tokens=max(1, output_chars // 4))
+        timings.append(ChunkTiming(stage, 0, estimate_tokens(prompt), time.perf_counter() - started))
+
+    # Runs the map phase and any intermediate merges, and returns the prompt of
+    # the one remaining call
+    def _final_prompt(self, segments, custom_prompt, timings):
+        with tracer.span("prompt_build", segments=len(segments)) as span:
+            text = ' '.join([t['text'] for t in segments])
+            span.set(transcript_tokens=estimate_tokens(text))
+            if estimate_tokens(text) <= self.max_tokens:
+                span.set(windows=1)
+                return "single", f"{custom_prompt}\n{text}"
+
+            windows = split_windows(segments, self.max_tokens, self.overlap_tokens)
+            focus = f"Pay particular attention to: {custom_prompt}" if custom_prompt else ""
+            prompts = [MAP_PROMPT.format(index=i + 1, total=len(windows), focus=focus,
+                                         text=' '.join([t['text'] for t in window]))
+                       for i, window in enumerate(windows)]
+            span.set(windows=len(windows))
+        partials = self._fan_out("map", prompts, timings)
+        return "reduce", self._reduce_prompt(partials, custom_prompt, timings)
+
+    def _reduce_prompt(self, partials, custom_prompt, timings):
+        joined = "\n\n".join(partials)
+        if len(partials) <= 2 or estimate_tokens(joined) <= self.max_tokens:
+            return REDUCE_PROMPT.format(custom_prompt=custom_prompt, text=joined)
+
+        # Too long to merge at once: merge neighbouring groups first. Every
+        # group takes at least two partials so each level shrinks the list.
+        groups = []
+        current = []
+        current_tokens = 0
+        for partial in partials:
+            tokens = estimate_tokens(partial)
+            if len(current) >= 2 and current_tokens + tokens > self.max_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(partial)
+            current_tokens += tokens
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        elif current:
+            groups.append(current)
+
+        prompts = [REDUCE_PROMPT.format(custom_prompt="", text="\n\n".join(group)) for group in groups]
+        merged = self._fan_out("merge", prompts, timings)
+        return self._reduce_prompt(merged, custom_prompt, timings)
@@ -0,0 +1,259 @@
+import os
+import sys
+from backends import registry
+from clients import clients
+from bert_pool import BERT_MODEL, BertModel
+from spacy_engine import SPACY_MODEL
+from summary_cache import summary_key
+from streaming import SummaryStream
+from mapreduce import DEFAULT_WINDOW_TOKENS, WINDOW_TOKENS, MapReduceSummarizer, estimate_tokens
+from tracing import tracer
+from compaction import compact_transcript
+from segment_index import TIMESTAMP_INSTRUCTION
+
+# SDKs and models are imported on first use, see the registry below
+
+def _import_openai():
+    import openai
+    return openai
+
+def _import_gemini():
+    import google.generativeai as genai
+    return genai
+
+def _import_spacy():
+    import spacy
+    import spacy_engine
+    return spacy_engine
+
+def _import_bert():
+    import summarizer
+    return summarizer
+
+def _import_fake():
+    import fake_backends
+    return fake_backends
+
+registry.register("ChatGPT", _import_openai, lambda openai: openai.OpenAI)
+registry.register("Google Gemini", _import_gemini)
+registry.register("SpaCy", _import_spacy, lambda spacy_engine: spacy_engine.load_pipeline())
+# One warm model per process, see bert_pool for the multi-process variant
+registry.register("BERT", _import_bert, lambda summarizer: BertModel())
+# Local stand-in with LLM-like latency, for testing without an API key
+registry.register("Fake", _import_fake, lambda fake_backends: fake_backends.FakeBackend())
+
+SUMMARIZERS = registry.names()
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+GEMINI_MODEL = 'gemini-1.5-flash'
+# Seconds before an LLM request is abandoned, so a hung call frees its thread
+REQUEST_TIMEOUT = float(os.getenv("SUMMARIZER_REQUEST_TIMEOUT", "120"))
+
+MODEL_NAMES = {
+    "ChatGPT": OPENAI_MODEL,
+    "Google Gemini": GEMINI_MODEL,
+    "SpaCy": SPACY_MODEL,
+    "BERT": BERT_MODEL,
+    "Fake": "fake",
+}
+
+model = ""
+
+def startGemini(api_key):
+    global model
+    model = clients.gemini(api_key, GEMINI_MODEL)
+
+def getApiKey():
+    return os.getenv("OPENAI_API_KEY", "no api key set")
+
+def getGeminiKey():
+    return os.getenv("GEMINI_API_KEY", "no gemini api key set")
+
+def getVideoID(video_url):
+    if '?v=' in video_url:
+        return video_url.split('?v=')[1].split('&')[0]
+    elif 'live/' in video_url:
+        return video_url.split('live/')[1].split('?')[0]
+    elif 'youtu.be' in video_url:
+        return video_url.split('be/')[1].split('?')[0]
+    else:
+        # stderr, so headless callers keep stdout for their JSON output
+        print(f'Not a recognized YouTube link: {video_url}', file=sys.stderr)
+        return video_url
+
+def get_summary_spacy(text, n_process=1):
+    nlp = registry.get("SpaCy")
+    import spacy_engine
+    return spacy_engine.summarize(nlp, text, n_process=n_process)
+
+def get_summary_bert(text):
+    model = registry.get("BERT")
+    summary = model(text)
+    return summary
+
+def get_summary_chatgpt(prompt):
+    client = clients.openai(os.getenv("OPENAI_API_KEY"))
+    messages = [{"role": "user", "content": prompt}]
+    chat_completion = client.chat.completions.create(
+        messages=messages,
+        model=OPENAI_MODEL,
+        timeout=REQUEST_TIMEOUT,
+    )
+    return chat_completion.choices[0].message.content
+
+def get_summary_gemini(prompt):
+    response = model.generate_content(prompt, request_options={"timeout": REQUEST_TIMEOUT})
+    return response.text
+
+def get_summary_fake(prompt):
+    return registry.get("Fake")(prompt)
+
+def stream_summary_chatgpt(prompt):
+    client = clients.openai(os.getenv("OPENAI_API_KEY"))
+    messages = [{"role": "user", "content": prompt}]
+    chunks = client.chat.completions.create(
+        messages=messages,
+        model=OPENAI_MODEL,
+        stream=True,
+        timeout=REQUEST_TIMEOUT,
+    )
+    for chunk in chunks:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def stream_summary_gemini(prompt):
+    response = model.generate_content(prompt, stream=True, request_options={"timeout": REQUEST_TIMEOUT})
+    for chunk in response:
+        yield chunk.text
+
+def stream_summary_fake(prompt):
+    yield from registry.get("Fake").stream(prompt)
+
+LLM_SUMMARIZERS = {
+    "ChatGPT": get_summary_chatgpt,
+    "Google Gemini": get_summary_gemini,
+    "Fake": get_summary_fake,
+}
+
+LLM_STREAMERS = {
+    "ChatGPT": stream_summary_chatgpt,
+    "Google Gemini": stream_summary_gemini,
+    "Fake": stream_summary_fake,
+}
+
+def _cache_key(transcript, summarizer, custom_prompt):
+    text = ' '.join([t['text'] for t in transcript])
+    # Extractive backends ignore the prompt, so it must not split their entries
+    prompt = custom_prompt if summarizer in LLM_SUMMARIZERS else ""
+    return summary_key(text, summarizer, MODEL_NAMES.get(summarizer, ""), prompt), text, prompt
+
+# LLM prompts are built from the compacted transcript: caption noise,
+# fillers and repeated caption lines removed, and with a `budget` trimmed to
+# that many tokens. The extractive backends get the transcript as is.
+def _compact(transcript, summarizer, compact, budget, stats):
+    if not compact or summarizer not in LLM_SUMMARIZERS:
+        return transcript
+    with tracer.span("compaction", segments=len(transcript)) as span:
+        transcript, report = compact_transcript(transcript, budget)
+        span.set(tokens_before=report.tokens_before, tokens_after=report.tokens_after)
+    if stats is not None:
+        stats["compaction"] = report
+    return transcript
+
+# `focus` (e.g. a SegmentFocus) picks the passages relevant to the custom
+# prompt, so only those are sent to LLM backends, marked with timestamps
+def _focus(transcript, summarizer, custom_prompt, focus, stats):
+    if focus is None or not custom_prompt.strip() or summarizer not in LLM_SUMMARIZERS:
+        return transcript, custom_prompt
+    focused, report = focus(transcript, custom_prompt)
+    if report is not None and stats is not None:
+        stats["focus"] = report
+    if focused is None:
+        return transcript, custom_prompt
+    return focused, f"{custom_prompt}\n{TIMESTAMP_INSTRUCTION}"
+
+# `stats`, if given, is filled with per-chunk timings of the LLM calls, the
+# CompactionReport, the FocusReport and, when a SummaryCache is passed,
+# "cache": "hit" or "fresh"
+def summarize_transcript(transcript, summarizer, custom_prompt, stats=None, cache=None, compact=True, budget=None,
+                         focus=None):
+    transcript = _compact(transcript, summarizer, compact, budget, stats)
+    transcript, custom_prompt = _focus(transcript, summarizer, custom_prompt, focus, stats)
+    return cached_summary(transcript, summarizer, custom_prompt,
+                          lambda: _summarize_transcript(transcript, summarizer, custom_prompt, stats), stats, cache)
+
+# Looks the summary up in `cache` and otherwise calls `compute()` and stores
+# the result, setting stats["cache"]. For callers that summarize some other
+# way, such as a BertPool.
+def cached_summary(transcript, summarizer, custom_prompt, compute, stats=None, cache=None):
+    if cache is None:
+        return compute()
+
+    key, text, prompt = _cache_key(transcript, summarizer, custom_prompt)
+    summary = cache.get(key)
+    if stats is not None:
+        stats["cache"] = "fresh" if summary is None else "hit"
+    if summary is None:
+        summary = compute()
+        cache.put(key, text, summarizer, MODEL_NAMES.get(summarizer, ""), prompt, summary)
+    return summary
+
+def _summarize_transcript(transcript, summarizer, custom_prompt, stats):
+    if summarizer in LLM_SUMMARIZERS:
+        # Transcripts over the window budget are split and map-reduced;
+        # shorter ones still go out as a single prompt
+        mapper = MapReduceSummarizer(LLM_SUMMARIZERS[summarizer],
+                                     max_tokens=WINDOW_TOKENS.get(summarizer, DEFAULT_WINDOW_TOKENS))
+        result = mapper.summarize(transcript, custom_prompt)
+        if stats is not None:
+            stats["timings"] = result.timings
+        return result.summary
+
+    with tracer.span("prompt_build", segments=len(transcript)) as span:
+        transcript_word_list = ' '.join([t['text'] for t in transcript])
+        span.set(transcript_tokens=estimate_tokens(transcript_word_list))
+
+    with tracer.span("model_call", stage="single", prompt_tokens=estimate_tokens(transcript_word_list)) as span:
+        if summarizer == "SpaCy":
+            summary = get_summary_spacy(transcript_word_list)
+        elif summarizer == "BERT":
+            summary = get_summary_bert(transcript_word_list)
+        else:
+            raise ValueError(f"Unknown summarizer: {summarizer}")
+        span.set(output_tokens=estimate_tokens(summary))
+
+    return summary
+
+# Streaming counterpart of summarize_transcript. Returns a SummaryStream of
+# text deltas; only uncached LLM summaries produce more than one delta.
+# `stream_fn`, if given, makes the last LLM call in place of the backend's
+# streamer, after any map phase (see HedgedDispatcher).
+def stream_transcript(transcript, summarizer, custom_prompt, stats=None, cache=None, compact=True, budget=None,
+                      focus=None, stream_fn=None):
+    transcript = _compact(transcript, summarizer, compact, budget, stats)
+    transcript, custom_prompt = _focus(transcript, summarizer, custom_prompt, focus, stats)
+    on_complete = None
+    if cache is not None:
+        key, text, prompt = _cache_key(transcript, summarizer, custom_prompt)
+        summary = cache.get(key)
+        if stats is not None:
+            stats["cache"] = "fresh" if summary is None else "hit"
+        if summary is not None:
+            return SummaryStream(iter([summary]))
+
+        def on_complete(summary):
+            cache.put(key, text, summarizer, MODEL_NAMES.get(summarizer, ""), prompt, summary)
+
+    if summarizer in LLM_STREAMERS:
+        mapper = MapReduceSummarizer(LLM_SUMMARIZERS[summarizer],
+                                     max_tokens=WINDOW_TOKENS.get(summarizer, DEFAULT_WINDOW_TOKENS))
+        timings = []
+        if stats is not None:
+            stats["timings"] = timings
+        deltas = mapper.stream(transcript, stream_fn or LLM_STREAMERS[summarizer], custom_prompt, timings)
+        return SummaryStream(deltas, on_complete)
+
+    def _single():
+        yield _summarize_transcript(transcript, summarizer, custom_prompt, stats)
+
+    return SummaryStream(_single(), on_complete)
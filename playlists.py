@@ -0,0 +1,133 @@
+import json
+import re
+from urllib.parse import parse_qs, urlparse
+
+from clients import clients
+from pipeline import getVideoID
+from tracing import tracer
+
+YOUTUBE_URL = "https://www.youtube.com"
+WATCH_URL = "https://www.youtube.com/watch?v={video_id}"
+MAX_PAGES = 50  # Continuation pages per playlist or channel, 100 videos each
+
+CHANNEL_PATH = re.compile(r"^/(@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)")
+INITIAL_DATA = re.compile(r"(?:var ytInitialData|window\[\"ytInitialData\"\])\s*=\s*({.+?});\s*</script>", re.DOTALL)
+API_KEY = re.compile(r'"INNERTUBE_API_KEY"\s*:\s*"([^"]+)"')
+CLIENT_VERSION = re.compile(r'"INNERTUBE_CLIENT_VERSION"\s*:\s*"([^"]+)"')
+VIDEO_RENDERERS = ("playlistVideoRenderer", "videoRenderer", "gridVideoRenderer", "reelItemRenderer")
+
+
+class ExpansionError(Exception):
+    pass
+
+
+# Classifies a URL as ("video", video_id), ("playlist", list_id) or
+# ("channel", path). Watch URLs that also carry a list= stay single videos.
+def parse_source(url):
+    parsed = urlparse(url)
+    if parsed.path == "/playlist":
+        list_id = parse_qs(parsed.query).get("list", [None])[0]
+        if list_id:
+            return "playlist", list_id
+    match = CHANNEL_PATH.match(parsed.path)
+    if match and "youtube.com" in parsed.netloc:
+        return "channel", match.group(1)
+    return "video", getVideoID(url)
+
+
+def _walk(data):
+    # Yields ("video", id) and ("continuation", token) from ytInitialData or
+    # a browse response, in page order
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            for renderer in VIDEO_RENDERERS:
+                if renderer in node and "videoId" in node[renderer]:
+                    yield "video", node[renderer]["videoId"]
+            token = node.get("continuationCommand", {}).get("token")
+            if token:
+                yield "continuation", token
+            stack.extend(reversed(list(node.values())))
+
+
+def _collect(data, video_ids):
+    continuation = None
+    for kind, value in _walk(data):
+        if kind == "video":
+            video_ids.append(value)
+        else:
+            continuation = value
+    return continuation
+
+
+# The first page comes embedded in the HTML; further pages come from the same
+# browse endpoint the website uses, keyed by the continuation token
+def _list_videos(page_url, session, base_url, max_pages):
+    with tracer.span("playlist_expand", source=page_url) as span:
+        response = session.get(page_url, timeout=15, headers={"Accept-Language": "en"})
+        response.raise_for_status()
+        html = response.text
+        match = INITIAL_DATA.search(html)
+        if match is None:
+            raise ExpansionError(f"No video list found at {page_url}")
+
+        video_ids = []
+        continuation = _collect(json.loads(match.group(1)), video_ids)
+        api_key = API_KEY.search(html)
+        version = CLIENT_VERSION.search(html)
+        pages = 1
+        while continuation and api_key and pages < max_pages:
+            response = session.post(f"{base_url}/youtubei/v1/browse", params={"key": api_key.group(1)}, timeout=15,
+                                    json={"context": {"client": {"clientName": "WEB",
+                                                                 "clientVersion": version.group(1) if version else "2.0"}},
+                                          "continuation": continuation})
+            response.raise_for_status()
+            continuation = _collect(response.json(), video_ids)
+            pages += 1
+        span.set(pages=pages, videos=len(video_ids))
+    return video_ids
+
+
+def expand_url(url, session=None, base_url=None, max_pages=MAX_PAGES, source=None):
+    # `source` is the parse_source result when the caller already has it
+    session = session or clients.session
+    base_url = base_url or YOUTUBE_URL
+    kind, value = source or parse_source(url)
+    if kind == "video":
+        return [value]
+    if kind == "playlist":
+        return _list_videos(f"{base_url}/playlist?list={value}", session, base_url, max_pages)
+    return _list_videos(f"{base_url}/{value}/videos", session, base_url, max_pages)
+
+
+# Expands every playlist and channel URL into its videos and drops repeats,
+# keeping the first occurrence. Returns (videos, errors): videos is a list of
+# (video_id, url) pairs, where single-video URLs are kept as given, and errors
+# maps URLs that could not be expanded to the exception.
+def expand_urls(urls, session=None, base_url=None, max_pages=MAX_PAGES):
+    seen = set()
+    videos = []
+    errors = {}
+    for url in urls:
+        source = parse_source(url)  # Each URL is classified once
+        if source[0] == "video":
+            expanded = [(source[1], url)]
+        else:
+            try:
+                expanded = [(video_id, watch_url(video_id))
+                            for video_id in expand_url(url, session, base_url, max_pages, source)]
+            except Exception as e:
+                errors[url] = e
+                continue
+        for video_id, video_url in expanded:
+            if video_id not in seen:
+                seen.add(video_id)
+                videos.append((video_id, video_url))
+    return videos, errors
+
+
+def watch_url(video_id):
+    return WATCH_URL.format(video_id=video_id)
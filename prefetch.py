@@ -0,0 +1,132 @@
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled, VideoUnavailable
+
+from ratelimit import BackendLimiter
+from tracing import tracer
+
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0  # Seconds before the first retry; doubles each time
+MAX_BACKOFF = 30.0
+
+# Retrying these cannot help
+PERMANENT_ERRORS = (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable)
+PERMANENT_STATUS = (400, 401, 403, 404, 410)
+
+
+def is_retryable(e):
+    if isinstance(e, PERMANENT_ERRORS):
+        return False
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return status not in PERMANENT_STATUS
+
+
+# One line on stderr, rewritten in place at most every `interval` seconds:
+# done/total, failures, rate and ETA
+class Progress:
+    def __init__(self, total, stream=sys.stderr, label="transcripts", interval=0.2):
+        self.total = total
+        self.stream = stream
+        self.label = label
+        self.done = 0
+        self.failed = 0
+        self.interval = interval
+        self.started = time.monotonic()
+        self._written = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, failed=False):
+        with self._lock:
+            self.done += 1
+            self.failed += failed
+            now = time.monotonic()
+            if self.done < self.total and now - self._written < self.interval:
+                return
+            self._written = now
+            elapsed = now - self.started
+            rate = self.done / elapsed if elapsed else 0.0
+            eta = (self.total - self.done) / rate if rate else 0.0
+            end = "\n" if self.done == self.total else ""
+            self.stream.write(f"\r{self.label} {self.done}/{self.total}  {self.failed} failed  "
+                              f"{rate:.1f}/s  eta {eta:.0f}s {end}")
+            self.stream.flush()
+
+
+# Fills `transcript_cache` with the transcripts of `video_ids` using
+# `workers` threads, ahead of whoever reads them. Calls go through `limiter`,
+# so the YouTube rate limit holds however many workers run. Transient
+# failures are retried with exponential backoff and jitter.
+class Prefetcher:
+    def __init__(self, transcript_cache, language="en", workers=DEFAULT_WORKERS, limiter=None,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, progress=None, sleep=time.sleep):
+        self.transcript_cache = transcript_cache
+        self.language = language
+        self.limiter = limiter or BackendLimiter(workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.progress = progress
+        self.sleep = sleep
+        self.failures = {}  # video_id -> exception, for the videos that still failed
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    # Queues the videos in order, so the first ones are ready first
+    def start(self, video_ids):
+        for video_id in video_ids:
+            with self._lock:
+                if video_id in self._futures:
+                    continue
+                self._futures[video_id] = self._executor.submit(self._fetch, video_id)
+        return self
+
+    def _fetch(self, video_id):
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                self.transcript_cache.get_transcript(video_id, self.language, self.limiter)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempt == self.retries or not is_retryable(e):
+                    break
+                delay = min(MAX_BACKOFF, self.backoff * 2 ** attempt)
+                tracer.record("prefetch_backoff", delay, video_id=video_id, attempt=attempt + 1)
+                self.sleep(delay * random.uniform(0.5, 1.0))
+        if error is not None:
+            with self._lock:
+                self.failures[video_id] = error
+        if self.progress is not None:
+            self.progress.update(failed=error is not None)
+        return error
+
+    # Blocks until the prefetch of `video_id` is over, if one was started.
+    # Returns its exception, or None; the transcript is then in the cache.
+    def wait(self, video_id):
+        with self._lock:
+            future = self._futures.get(video_id)
+        return None if future is None else future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Prefetches everything and waits for it. Returns {video_id: exception} for
+# the videos that still failed.
+def prefetch_transcripts(video_ids, transcript_cache, language="en", workers=DEFAULT_WORKERS, limiter=None,
+                         retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, progress=None, sleep=time.sleep):
+    video_ids = list(video_ids)
+    prefetcher = Prefetcher(transcript_cache, language, workers, limiter, retries, backoff, progress, sleep)
+    prefetcher.start(video_ids)
+    try:
+        for video_id in video_ids:
+            prefetcher.wait(video_id)
+    finally:
+        prefetcher.shutdown()
+    return prefetcher.failures
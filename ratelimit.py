@@ -0,0 +1,66 @@
+import threading
+import time
+
+
+# Token bucket: allows `rate` calls per second with bursts of up to `burst`.
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Caps how many calls run at once against one backend and how fast they start.
+# `waiting` and `active` count the callers queued for and holding a slot.
+class BackendLimiter:
+    def __init__(self, concurrency, rate=None, burst=1):
+        self.concurrency = concurrency
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._rate = RateLimiter(rate, burst)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+
+    def _count(self, waiting=0, active=0):
+        with self._lock:
+            self.waiting += waiting
+            self.active += active
+
+    def __enter__(self):
+        self._count(waiting=1)
+        try:
+            self._semaphore.acquire()
+            try:
+                self._rate.acquire()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self._count(waiting=-1)
+        self._count(active=1)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._count(active=-1)
+        self._semaphore.release()
+        return False
+
+    def stats(self):
+        with self._lock:
+            return {"concurrency": self.concurrency, "waiting": self.waiting, "active": self.active}
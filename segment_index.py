@@ -0,0 +1,225 @@
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+
+from compaction import count_tokens
+from disk_cache import atomic_write, evict_lru, touch
+from mapreduce import estimate_tokens
+from summary_cache import transcript_hash
+from tracing import tracer
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "youtube-summarizer", "indexes")
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+INDEX_VERSION = 1
+
+PASSAGE_TOKENS = 200  # Consecutive segments are indexed in passages of about this size
+DEFAULT_FOCUS_TOKENS = 4000  # Prompt budget for the passages retrieved for a custom prompt
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TERM_PATTERN = re.compile(r"[a-z0-9']+")
+STOP_WORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his
+how i if in into is it its itself just me more most my no nor not now of off on once only or other our out over
+own same she should so some such than that the their them then there these they this those through to too under
+until up very was we were what when where which while who whom why will with would you your
+summarize summary video focus talk tell explain please
+""".split())
+
+TIMESTAMP_PATTERN = re.compile(r"\((?:(\d+):)?(\d{1,2}):(\d{2})\)")
+TIMESTAMP_INSTRUCTION = ("Each passage starts with its (mm:ss) timestamp. End every point of the summary "
+                         "with the timestamp of the passage it comes from, e.g. (12:34).")
+VIDEO_TIME_URL = "https://youtu.be/{video_id}?t={seconds}"
+
+
+def tokenize(text):
+    return [term for term in TERM_PATTERN.findall(text.lower()) if len(term) > 1 and term not in STOP_WORDS]
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def build_passages(segments, passage_tokens=PASSAGE_TOKENS):
+    passages = []
+    texts = []
+    tokens = 0
+    start = None
+    end = None
+    for segment in segments:
+        if texts and tokens + estimate_tokens(segment['text']) > passage_tokens:
+            passages.append({"start": start, "end": end, "text": ' '.join(texts)})
+            texts, tokens = [], 0
+        if not texts:
+            start = segment['start']
+        texts.append(segment['text'])
+        tokens += estimate_tokens(segment['text'])
+        end = segment['start'] + segment.get('duration', 0)
+    if texts:
+        passages.append({"start": start, "end": end, "text": ' '.join(texts)})
+    return passages
+
+
+# Inverted index over the timestamped passages of one transcript, scored with
+# BM25. Postings map each term to [passage, term frequency] pairs.
+class SegmentIndex:
+    def __init__(self, passages, postings, lengths):
+        self.passages = passages
+        self.postings = postings
+        self.lengths = lengths
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0
+
+    @classmethod
+    def build(cls, segments, passage_tokens=PASSAGE_TOKENS):
+        passages = build_passages(segments, passage_tokens)
+        postings = {}
+        lengths = []
+        for i, passage in enumerate(passages):
+            terms = tokenize(passage['text'])
+            lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings.setdefault(term, []).append([i, frequency])
+        return cls(passages, postings, lengths)
+
+    def search(self, query, limit=None):
+        # Returns [(score, passage index)], best first
+        scores = Counter()
+        count = len(self.passages)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, frequency in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / (self.average_length or 1))
+                scores[i] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return [(score, i) for i, score in scores.most_common(limit)]
+
+    # Best-scoring passages that fit in `budget` tokens, in time order
+    def select(self, query, budget):
+        chosen = []
+        used = 0
+        for _, i in self.search(query):
+            tokens = estimate_tokens(self.passages[i]['text'])
+            if used + tokens > budget:
+                continue
+            chosen.append(i)
+            used += tokens
+        return [self.passages[i] for i in sorted(chosen)]
+
+    def to_json(self):
+        return json.dumps({"version": INDEX_VERSION, "passages": self.passages, "postings": self.postings,
+                           "lengths": self.lengths})
+
+    @classmethod
+    def from_json(cls, data):
+        entry = json.loads(data)
+        if entry.get("version") != INDEX_VERSION:
+            raise ValueError("index written by another version")
+        return cls(entry["passages"], entry["postings"], entry["lengths"])
+
+
+# Keeps each video's index on disk next to the other caches, keyed by video
+# and transcript content, so an edited transcript gets a fresh index.
+class IndexStore:
+    def __init__(self, cache_dir=DEFAULT_INDEX_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, video_id, segments):
+        digest = transcript_hash(' '.join([t['text'] for t in segments]))
+        key = hashlib.sha1(f"{video_id}\0{digest}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, video_id, segments):
+        path = self._path(video_id, segments)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = SegmentIndex.from_json(f.read())
+        except (OSError, ValueError, KeyError):
+            index = SegmentIndex.build(segments)
+            atomic_write(path, index.to_json().encode("utf-8"))
+            evict_lru(self.cache_dir, self.max_bytes, ".json")
+        else:
+            touch(path)
+        return index
+
+
+class FocusReport:
+    def __init__(self, tokens_before, tokens_after, passages, matched):
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.passages = passages  # (start, end) of every passage sent
+        self.matched = matched
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    def as_dict(self):
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+            "passages": [[format_timestamp(start), format_timestamp(end)] for start, end in self.passages],
+        }
+
+    def report(self):
+        if not self.matched:
+            return "No passage matched the custom prompt; sent the whole transcript"
+        share = self.tokens_saved / self.tokens_before if self.tokens_before else 0
+        return (f"Custom prompt matched {len(self.passages)} passages: {self.tokens_before} -> "
+                f"{self.tokens_after} prompt tokens ({share:.0%} saved)")
+
+
+# Narrows a transcript to the passages relevant to a custom prompt. Called by
+# the pipeline with (segments, custom_prompt); returns the segments to send,
+# one per retrieved passage with its timestamp in front, and a FocusReport.
+# With a `store` and `video_id` the index is loaded from disk when it exists.
+class SegmentFocus:
+    def __init__(self, video_id=None, budget=DEFAULT_FOCUS_TOKENS, store=None):
+        self.video_id = video_id
+        self.budget = budget
+        self.store = store
+
+    def __call__(self, segments, query):
+        tokens_before = count_tokens(' '.join([t['text'] for t in segments]))
+        if tokens_before <= self.budget:
+            return None, None  # Already fits; nothing to gain
+        with tracer.span("retrieval", segments=len(segments)) as span:
+            if self.store is not None and self.video_id is not None:
+                index = self.store.get(self.video_id, segments)
+            else:
+                index = SegmentIndex.build(segments)
+            passages = index.select(query, self.budget)
+            span.set(passages=len(passages))
+        if not passages:
+            return None, FocusReport(tokens_before, tokens_before, [], False)
+
+        focused = [{"text": f"({format_timestamp(p['start'])}) {p['text']}", "start": p['start'],
+                    "duration": p['end'] - p['start']} for p in passages]
+        tokens_after = count_tokens(' '.join([t['text'] for t in focused]))
+        report = FocusReport(tokens_before, tokens_after, [(p['start'], p['end']) for p in passages], True)
+        return focused, report
+
+
+# Finds the (mm:ss) timestamps cited in a summary. Returns
+# [(timestamp, seconds, url)] in order of first appearance.
+def link_timestamps(summary, video_id):
+    links = []
+    seen = set()
+    for match in TIMESTAMP_PATTERN.finditer(summary):
+        hours, minutes, seconds = match.groups()
+        total = int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+        if total in seen:
+            continue
+        seen.add(total)
+        links.append((format_timestamp(total), total, VIDEO_TIME_URL.format(video_id=video_id, seconds=total)))
+    return links
@@ -0,0 +1,257 @@
+from backends import registry  # Imported first so startup timings cover everything below
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batch import DEFAULT_LIMITS, BatchRunner, make_limiters
+from pipeline import SUMMARIZERS, getVideoID, startGemini
+from playlists import watch_url
+from segment_index import DEFAULT_FOCUS_TOKENS, IndexStore
+from summary_cache import SummaryCache, normalize_prompt
+from tracing import PrometheusSink, tracer
+from transcript_cache import TranscriptCache
+
+DEFAULT_PORT = 8080
+DEFAULT_MAX_QUEUE = 64  # Requests waiting for one backend before new ones get a 503
+
+
+class Overloaded(Exception):
+    pass
+
+
+# Collapses concurrent calls with the same key into one: the first caller
+# runs fn, the others wait for its result (or exception). Nothing is kept
+# once the call finishes; finished summaries are memoized by SummaryCache.
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        return future.result(), not leader
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+# The summarization pipeline behind a shared set of caches and per-backend
+# limiters, for many concurrent callers
+class SummarizationService:
+    def __init__(self, summarizer="Google Gemini", limits=None, max_queue=DEFAULT_MAX_QUEUE,
+                 transcript_cache=None, summary_cache=None, index_store=None, focus_tokens=None):
+        self.summarizer = summarizer
+        self.max_queue = max_queue
+        self.transcript_cache = transcript_cache or TranscriptCache()
+        self.summary_cache = summary_cache
+        self.index_store = index_store
+        self.focus_tokens = focus_tokens
+        self.limiters = make_limiters(limits)
+        self.flights = SingleFlight()
+        self.metrics = PrometheusSink()
+        self.requests = {}  # status -> count
+        self._lock = threading.Lock()
+
+    def _count(self, status):
+        with self._lock:
+            self.requests[status] = self.requests.get(status, 0) + 1
+
+    def summarize(self, payload):
+        if not isinstance(payload, dict):
+            raise ValueError("request body must be a JSON object")
+        for field in ("url", "video_id", "language", "summarizer", "prompt"):
+            if field in payload and not isinstance(payload[field], str):
+                raise ValueError(f"{field} must be a string")
+        if payload.get("url"):
+            video_url = payload["url"]
+        elif payload.get("video_id"):
+            video_url = watch_url(payload["video_id"])
+        else:
+            raise ValueError("url or video_id is required")
+        summarizer = payload.get("summarizer", self.summarizer)
+        if summarizer not in SUMMARIZERS:
+            raise ValueError(f"Unknown summarizer: {summarizer}")
+        language = payload.get("language", "en")
+        prompt = payload.get("prompt", "")
+        video_id = getVideoID(video_url)
+
+        key = (video_id, language, summarizer, normalize_prompt(prompt))
+        result, coalesced = self.flights.do(key, lambda: self._compute(video_url, video_id, language, summarizer,
+                                                                      prompt))
+        return dict(result, coalesced=coalesced)
+
+    def _compute(self, video_url, video_id, language, summarizer, prompt):
+        if self.limiters[summarizer].waiting >= self.max_queue:
+            raise Overloaded(f"{summarizer} has {self.max_queue} requests queued")
+
+        # Requests for the same video with other backends or prompts still
+        # share one transcript download
+        def fetch():
+            return self.transcript_cache.get_transcript(video_id, language, self.limiters["YouTube"])
+        try:
+            self.flights.do(("transcript", video_id, language), fetch)
+        except Exception as e:
+            return {"url": video_url, "video_id": video_id, "language": language, "summarizer": summarizer,
+                    "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        runner = BatchRunner(summarizer, language, prompt, transcript_cache=self.transcript_cache,
+                             summary_cache=self.summary_cache, focus_tokens=self.focus_tokens,
+                             index_store=self.index_store, limiters=self.limiters)
+        return runner.summarize_url(video_url, video_id)
+
+    def stats(self):
+        with self._lock:
+            requests = dict(self.requests)
+        return {
+            "in_flight": self.flights.in_flight(),
+            "coalesced": self.flights.coalesced,
+            "requests": requests,
+            "backends": {name: limiter.stats() for name, limiter in self.limiters.items()},
+        }
+
+    def render_metrics(self):
+        stats = self.stats()
+        lines = [
+            "# HELP summarizer_backend_queue_depth Requests waiting for a backend slot.",
+            "# TYPE summarizer_backend_queue_depth gauge",
+        ]
+        for name, backend in sorted(stats["backends"].items()):
+            lines.append(f'summarizer_backend_queue_depth{{backend="{name}"}} {backend["waiting"]}')
+        lines += ["# HELP summarizer_backend_active Requests holding a backend slot.",
+                  "# TYPE summarizer_backend_active gauge"]
+        for name, backend in sorted(stats["backends"].items()):
+            lines.append(f'summarizer_backend_active{{backend="{name}"}} {backend["active"]}')
+        lines += ["# HELP summarizer_backend_concurrency Concurrency cap per backend.",
+                  "# TYPE summarizer_backend_concurrency gauge"]
+        for name, backend in sorted(stats["backends"].items()):
+            lines.append(f'summarizer_backend_concurrency{{backend="{name}"}} {backend["concurrency"]}')
+        lines += ["# HELP summarizer_in_flight Distinct computations running.",
+                  "# TYPE summarizer_in_flight gauge",
+                  f"summarizer_in_flight {stats['in_flight']}",
+                  "# HELP summarizer_coalesced_total Requests served by joining an identical computation.",
+                  "# TYPE summarizer_coalesced_total counter",
+                  f"summarizer_coalesced_total {stats['coalesced']}",
+                  "# HELP summarizer_requests_total Requests by outcome.",
+                  "# TYPE summarizer_requests_total counter"]
+        for status, count in sorted(stats["requests"].items()):
+            lines.append(f'summarizer_requests_total{{status="{status}"}} {count}')
+        return "\n".join(lines) + "\n" + self.metrics.render()
+
+
+def make_handler(service):
+    class ServiceHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json"):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            if status == 503:
+                self.send_header("Retry-After", "5")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/healthz":
+                self._send(200, json.dumps({"status": "ok"}))
+            elif self.path == "/stats":
+                self._send(200, json.dumps(service.stats()))
+            elif self.path == "/metrics":
+                self._send(200, service.render_metrics(), "text/plain; version=0.0.4")
+            else:
+                self._send(404, json.dumps({"error": "not found"}))
+
+        def do_POST(self):
+            if self.path != "/summarize":
+                self._send(404, json.dumps({"error": "not found"}))
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                result = service.summarize(payload)
+            except (ValueError, KeyError, TypeError) as e:
+                service._count("bad_request")
+                self._send(400, json.dumps({"status": "error", "error": str(e)}))
+                return
+            except Overloaded as e:
+                service._count("overloaded")
+                self._send(503, json.dumps({"status": "error", "error": str(e)}))
+                return
+            service._count(result["status"])
+            self._send(200 if result["status"] == "ok" else 502, json.dumps(result))
+
+    return ServiceHandler
+
+
+def serve(service, host="127.0.0.1", port=DEFAULT_PORT):
+    tracer.add_sink(service.metrics)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve summaries over HTTP: POST /summarize, GET /metrics.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-s", "--summarizer", choices=SUMMARIZERS, default="Google Gemini",
+                        help="backend for requests that do not name one")
+    parser.add_argument("--limit", action="append", default=[], metavar="BACKEND=CONCURRENCY[:RATE]",
+                        help="concurrency cap and calls per second for a backend, e.g. 'ChatGPT=8:2'")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="requests waiting per backend before new ones are rejected with 503")
+    parser.add_argument("--focus-tokens", type=int, default=0,
+                        help="with a custom prompt, send only the best-matching passages up to this many tokens, "
+                             f"e.g. {DEFAULT_FOCUS_TOKENS} (default 0 sends the whole transcript)")
+    parser.add_argument("--no-summary-cache", action="store_true", help="always call the summarizer")
+    args = parser.parse_args(argv)
+
+    limits = {}
+    for item in args.limit:
+        name, _, value = item.partition("=")
+        if name not in DEFAULT_LIMITS:
+            parser.error(f"unknown backend in --limit: {name}")
+        concurrency, _, rate = value.partition(":")
+        limits[name] = (int(concurrency), float(rate) if rate else None)
+
+    if os.getenv("GEMINI_API_KEY"):
+        startGemini(os.getenv("GEMINI_API_KEY"))
+
+    service = SummarizationService(args.summarizer, limits, args.max_queue,
+                                   summary_cache=None if args.no_summary_cache else SummaryCache(),
+                                   index_store=IndexStore(), focus_tokens=args.focus_tokens)
+    server = serve(service, args.host, args.port)
+    registry.mark("service ready")
+    print(f"Serving on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
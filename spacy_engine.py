@@ -0,0 +1,79 @@
+SPACY_MODEL = 'en_core_web_sm'
+SUMMARY_RATIO = 0.20
+# Text is fed to spaCy in chunks of roughly this many characters, so no single
+# Doc ever holds a multi-hour transcript
+CHUNK_CHARS = 20000
+
+# Frequency scoring only needs tokens, lexical flags and sentence boundaries
+EXCLUDED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
+
+def load_pipeline(model=SPACY_MODEL):
+    import spacy
+
+    nlp = spacy.load(model, exclude=EXCLUDED_COMPONENTS)
+    # The statistical sentence recognizer ships disabled and is much cheaper
+    # than the parser; fall back to punctuation rules if the model lacks it
+    if "senter" in nlp.disabled:
+        nlp.enable_pipe("senter")
+    elif "senter" not in nlp.pipe_names:
+        nlp.add_pipe("sentencizer")
+
+    if "tok2vec" in nlp.pipe_names and not nlp.get_pipe("tok2vec").listening_components:
+        nlp.remove_pipe("tok2vec")
+    return nlp
+
+
+def split_chunks(text, chunk_chars=CHUNK_CHARS):
+    start = 0
+    while start < len(text):
+        end = start + chunk_chars
+        if end < len(text):
+            # Prefer cutting after a sentence end, then at any whitespace
+            cut = max(text.rfind(". ", start, end), text.rfind("? ", start, end), text.rfind("! ", start, end)) + 1
+            if cut <= start:
+                cut = text.rfind(" ", start, end)
+            if cut > start:
+                end = cut + 1
+        yield text[start:end]
+        start = end
+
+
+def summarize(nlp, text, ratio=SUMMARY_RATIO, chunk_chars=CHUNK_CHARS, n_process=1, batch_size=4):
+    import numpy as np
+    from spacy.attrs import IS_PUNCT, IS_SPACE, IS_STOP, LOWER
+
+    sentences = []
+    term_chunks = []  # Lowercase term hashes of scoring tokens
+    owner_chunks = []  # Index of the sentence each of those tokens belongs to
+
+    for doc in nlp.pipe(split_chunks(text, chunk_chars), n_process=n_process, batch_size=batch_size):
+        attrs = doc.to_array([LOWER, IS_STOP, IS_PUNCT, IS_SPACE])
+        keep = (attrs[:, 1] == 0) & (attrs[:, 2] == 0) & (attrs[:, 3] == 0)
+
+        owner = np.empty(len(doc), dtype=np.int64)
+        for sent in doc.sents:
+            owner[sent.start:sent.end] = len(sentences)
+            sentences.append(sent.text.strip())
+
+        term_chunks.append(attrs[keep, 0])
+        owner_chunks.append(owner[keep])
+
+    if not sentences:
+        return ""
+
+    terms = np.concatenate(term_chunks)
+    owners = np.concatenate(owner_chunks)
+    if not len(terms):
+        return ""
+
+    # Word frequency normalised by the most frequent word, counted case-insensitively
+    _, term_index, counts = np.unique(terms, return_inverse=True, return_counts=True)
+    weights = counts / counts.max()
+    scores = np.bincount(owners, weights=weights[term_index], minlength=len(sentences))
+
+    select_length = int(len(sentences) * ratio)
+    # Sentences without a single scoring word are never picked
+    candidates = np.flatnonzero(scores > 0)
+    order = candidates[np.argsort(-scores[candidates], kind="stable")][:select_length]
+    return ' '.join(sentences[i] for i in order)
@@ -0,0 +1,46 @@
+import time
+
+from tracing import tracer
+
+
+# Wraps an iterator of text deltas and records time to first token and total
+# time. Iterate it to consume the deltas; `text` holds everything seen so far.
+# `on_complete` is called with the full text once the deltas run out.
+class SummaryStream:
+    def __init__(self, deltas, on_complete=None):
+        self._deltas = deltas
+        self._on_complete = on_complete
+        self._parts = []
+        self.started = time.perf_counter()
+        self.first_token_seconds = None
+        self.total_seconds = None
+
+    def __iter__(self):
+        for delta in self._deltas:
+            if not delta:
+                continue
+            if self.first_token_seconds is None:
+                self.first_token_seconds = time.perf_counter() - self.started
+                tracer.record("first_token", self.first_token_seconds)
+            self._parts.append(delta)
+            yield delta
+        self.total_seconds = time.perf_counter() - self.started
+        if self._on_complete is not None:
+            self._on_complete(self.text)
+
+    def close(self):
+        close = getattr(self._deltas, "close", None)
+        if close is not None:
+            close()
+
+    @property
+    def text(self):
+        return ''.join(self._parts)
+
+    def report(self):
+        if self.first_token_seconds is None:
+            return "No output received"
+        line = f"Time to first token {self.first_token_seconds:.2f}s"
+        if self.total_seconds is not None:
+            line += f", complete in {self.total_seconds:.2f}s"
+        return line
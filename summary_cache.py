@@ -0,0 +1,94 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "youtube-summarizer", "summaries.sqlite3")
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    transcript_hash TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used);
+"""
+
+
+def transcript_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_prompt(prompt):
+    return ' '.join(prompt.split())
+
+
+def summary_key(text, backend, model, prompt):
+    parts = [transcript_hash(text), backend, model, normalize_prompt(prompt)]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+# SQLite-backed memo of finished summaries, keyed by transcript content,
+# backend, model and prompt. Least recently used rows are evicted once the
+# stored summaries exceed max_bytes.
+class SummaryCache:
+    def __init__(self, path=DEFAULT_DB_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._db:
+            self._db.executescript(SCHEMA)
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._db:
+                self._db.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key, text, backend, model, prompt, summary):
+        now = time.time()
+        size = len(summary.encode("utf-8"))
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, transcript_hash(text), backend, model, normalize_prompt(prompt), summary, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM summaries ORDER BY last_used").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM summaries WHERE key = ?", stale)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,79 @@
+import hashlib
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from clients import clients
+from disk_cache import atomic_write, evict_lru, touch
+from tracing import tracer
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "youtube-summarizer", "thumbnails")
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+THUMBNAIL_SIZE = (500, 500)
+
+# hqdefault exists for every video, unlike maxresdefault
+THUMBNAIL_URL = "https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
+
+
+def thumbnail_url(video_id):
+    return THUMBNAIL_URL.format(video_id=video_id)
+
+
+def download_thumbnail(video_id):
+    response = clients.session.get(thumbnail_url(video_id), timeout=10)
+    response.raise_for_status()
+    return response.content
+
+
+# Disk cache of thumbnails already shrunk to display size. A hit decodes the
+# small cached JPEG; a miss downloads, resizes and stores it. Both return a
+# fully decoded PIL image, so call this off the UI thread.
+class ThumbnailCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, size=THUMBNAIL_SIZE,
+                 download=download_thumbnail):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.size = size
+        self.download = download
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, video_id):
+        key = hashlib.sha1(f"{video_id}\0{self.size}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".jpg")
+
+    def get(self, video_id):
+        with tracer.span("thumbnail_fetch", video_id=video_id) as span:
+            img = self._read(video_id)
+            span.set(cache="miss" if img is None else "hit")
+            if img is None:
+                data = self.download(video_id)
+                span.set(bytes=len(data))
+                img = self._store(video_id, data)
+        return img
+
+    def _read(self, video_id):
+        path = self._path(video_id)
+        try:
+            img = Image.open(path)
+            img.load()
+        except (OSError, ValueError):
+            return None
+        touch(path)
+        self.hits += 1
+        return img
+
+    def _store(self, video_id, data):
+        self.misses += 1
+        img = Image.open(BytesIO(data))
+        # draft() lets the JPEG decoder skip straight to a reduced scale
+        img.draft("RGB", self.size)
+        img = img.convert("RGB")
+        img.thumbnail(self.size)
+
+        out = BytesIO()
+        img.save(out, "JPEG", quality=90)
+        atomic_write(self._path(video_id), out.getvalue())
+        evict_lru(self.cache_dir, self.max_bytes, ".jpg")
+        return img
@@ -0,0 +1,222 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Attributes (video_id, backend, ...) attached to every span opened in the
+# current context. Thread pools must run work through copy_context() to keep it.
+_context = contextvars.ContextVar("trace_context", default={})
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def as_dict(self):
+        data = {"name": self.name, "start": self.start, "duration": self.duration, "thread": self.thread}
+        data.update(self.attrs)
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+# Times pipeline stages and hands finished spans to every registered sink.
+# A sink is anything with an emit(span) method.
+class Tracer:
+    def __init__(self):
+        self._sinks = []
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        with self._lock:
+            self._sinks = self._sinks + [sink]
+        return sink
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self._sinks = [s for s in self._sinks if s is not sink]
+
+    @contextmanager
+    def context(self, **attrs):
+        token = _context.set({**_context.get(), **attrs})
+        try:
+            yield
+        finally:
+            _context.reset(token)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = Span(name, {**_context.get(), **attrs})
+        started = time.perf_counter()
+        try:
+            yield span
+        except GeneratorExit:
+            span.set(cancelled=True)  # A stream was closed before it finished
+            raise
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            self._emit(span)
+
+    # For stages timed elsewhere, e.g. time to first token of a stream
+    def record(self, name, duration, **attrs):
+        span = Span(name, {**_context.get(), **attrs})
+        span.start -= duration
+        span.duration = duration
+        self._emit(span)
+
+    def _emit(self, span):
+        for sink in self._sinks:
+            try:
+                sink.emit(span)
+            except Exception as e:
+                print(f"Trace sink {type(sink).__name__} failed: {e}")
+
+
+def _format_attrs(attrs):
+    return ' '.join(f"{k}={v}" for k, v in attrs.items() if v is not None)
+
+
+# One line per span through `write` (print by default, so it lands in the
+# debug console when stdout is redirected there)
+class ConsoleSink:
+    def __init__(self, write=print):
+        self.write = write
+
+    def emit(self, span):
+        status = f" error={span.error!r}" if span.error else ""
+        self.write(f"[trace] {span.name:<16} {span.duration * 1000:8.1f} ms  {_format_attrs(span.attrs)}{status}")
+
+    def close(self):
+        pass
+
+
+# Chrome trace event file (JSON array format), viewable in Perfetto or
+# chrome://tracing. The closing bracket is optional in that format, so events
+# can be appended as they finish and the file stays valid if the app dies.
+class JsonTraceSink:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._tids = {}
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._file.flush()
+
+    def emit(self, span):
+        with self._lock:
+            tid = self._tids.setdefault(span.thread, len(self._tids) + 1)
+            args = dict(span.attrs)
+            if span.error:
+                args["error"] = span.error
+            event = {
+                "name": span.name,
+                "ph": "X",
+                "ts": int(span.start * 1e6),
+                "dur": int(span.duration * 1e6),
+                "pid": self._pid,
+                "tid": tid,
+                "args": args,
+            }
+            self._file.write(json.dumps(event) + ",\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+# Aggregates spans into per-stage latency histograms in the Prometheus text
+# format; serve() exposes them on http://127.0.0.1:<port>/metrics
+class PrometheusSink:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # (stage, backend, status) -> [bucket counts, count, sum]
+        self._server = None
+
+    def emit(self, span):
+        key = (span.name, span.attrs.get("backend", ""), "error" if span.error else "ok")
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += span.duration
+
+    def render(self):
+        lines = [
+            "# HELP summarizer_stage_seconds Latency of pipeline stages.",
+            "# TYPE summarizer_stage_seconds histogram",
+        ]
+        with self._lock:
+            for (stage, backend, status), (counts, count, total) in sorted(self._series.items()):
+                labels = f'stage="{stage}",backend="{backend}",status="{status}"'
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'summarizer_stage_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+                lines.append(f'summarizer_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"summarizer_stage_seconds_count{{{labels}}} {count}")
+                lines.append(f"summarizer_stage_seconds_sum{{{labels}}} {total:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        sink = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server.server_port
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+# `console` is a write function (e.g. print) or None to skip the console sink
+def install_sinks(console=None, trace_file=None, metrics_port=None):
+    sinks = []
+    if console is not None:
+        sinks.append(tracer.add_sink(ConsoleSink(console)))
+    if trace_file:
+        sinks.append(tracer.add_sink(JsonTraceSink(trace_file)))
+    if metrics_port is not None:
+        sink = tracer.add_sink(PrometheusSink())
+        sink.serve(metrics_port)
+        sinks.append(sink)
+    return sinks
+
+
+tracer = Tracer()
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from clients import clients
+from disk_cache import atomic_write, evict_lru, remove, touch
+from tracing import tracer
+
+try:
+    from youtube_transcript_api._transcripts import TranscriptListFetcher
+except ImportError:  # Internal module; fall back to the public API if it moves
+    TranscriptListFetcher = None
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "youtube-summarizer", "transcripts")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+# Language lists are stored under this pseudo language code
+LANGUAGES_KEY = "*"
+
+
+def list_transcripts(video_id):
+    if TranscriptListFetcher is None:
+        return YouTubeTranscriptApi.list_transcripts(video_id)
+    # Same as YouTubeTranscriptApi.list_transcripts, but over the shared
+    # keep-alive session instead of a new Session per call
+    return TranscriptListFetcher(clients.session).fetch(video_id)
+
+
+def fetch_languages(video_id):
+    transcript_list = list_transcripts(video_id)
+    return [transcript.language_code for transcript in transcript_list]
+
+
+def fetch_segments(video_id, language):
+    return list_transcripts(video_id).find_transcript([language]).fetch()
+
+
+# On-disk transcript store keyed by (video_id, language). Every entry is its own
+# JSON file written with an atomic rename, so several app instances can share
+# the same directory. File mtimes double as the LRU clock.
+class TranscriptCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL,
+                 fetch_languages=fetch_languages, fetch_segments=fetch_segments):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.fetch_languages = fetch_languages
+        self.fetch_segments = fetch_segments
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, video_id, language):
+        key = hashlib.sha1(f"{video_id}\0{language}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _read(self, video_id, language):
+        path = self._path(video_id, language)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self.ttl is not None and time.time() - entry.get("fetched_at", 0) > self.ttl:
+            remove(path)
+            return None
+
+        touch(path)  # Mark as recently used
+        return entry["data"]
+
+    def _write(self, video_id, language, data):
+        entry = {
+            "video_id": video_id,
+            "language": language,
+            "fetched_at": time.time(),
+            "data": data,
+        }
+        atomic_write(self._path(video_id, language), json.dumps(entry).encode("utf-8"))
+        evict_lru(self.cache_dir, self.max_bytes, ".json")
+
+    def list_languages(self, video_id):
+        with tracer.span("transcript_list", video_id=video_id) as span:
+            languages = self._read(video_id, LANGUAGES_KEY)
+            self._count(languages is not None)
+            span.set(cache="miss" if languages is None else "hit")
+            if languages is None:
+                languages = self.fetch_languages(video_id)
+                self._write(video_id, LANGUAGES_KEY, languages)
+            span.set(languages=len(languages))
+        return languages
+
+    # `limiter` (e.g. a BackendLimiter) is only taken for a download, so
+    # cache hits do not wait for the YouTube rate limit
+    def get_transcript(self, video_id, language, limiter=None):
+        with tracer.span("transcript_fetch", video_id=video_id, language=language) as span:
+            segments = self._read(video_id, language)
+            self._count(segments is not None)
+            span.set(cache="miss" if segments is None else "hit")
+            if segments is None:
+                if limiter is not None:
+                    with limiter:
+                        segments = self.fetch_segments(video_id, language)
+                else:
+                    segments = self.fetch_segments(video_id, language)
+                self._write(video_id, language, segments)
+            span.set(segments=len(segments), transcript_chars=sum(len(t['text']) for t in segments))
+        return segments
+
+    def invalidate(self, video_id, language=LANGUAGES_KEY):
+        remove(self._path(video_id, language))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}